@@ -0,0 +1,71 @@
+"""
+Benchmark da conciliação bancária.
+
+Gera um ledger sintético, monta um extrato de um ano de um banco a partir dos próprios
+lançamentos (com parte das datas deslocadas e algumas linhas faltando/sobrando) e mede
+o tempo de `conciliacao.conciliar`.
+
+Uso: python benchmarks/bench_conciliacao.py [--linhas 1000000] [--janela 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import sintetico  # ajusta o sys.path para src/
+import db
+from conciliacao import conciliar
+
+BANCO = "NuBank"
+
+
+def montar_extrato(janela, semente=7):
+    rnd = np.random.default_rng(semente)
+    fim = date.today()
+    inicio = fim - timedelta(days=365)
+    ledger = db.load_conciliacao(BANCO, inicio.isoformat(), fim.isoformat())
+
+    # 2% dos lançamentos não aparecem no extrato; 20% compensam com alguns dias de diferença
+    extrato = ledger.sample(frac=0.98, random_state=semente)[["data", "valor", "descricao"]].copy()
+    deslocar = rnd.random(len(extrato)) < 0.2
+    datas = pd.to_datetime(extrato["data"])
+    datas[deslocar] += pd.to_timedelta(rnd.integers(-janela, janela + 1, deslocar.sum()), unit="D")
+    extrato["data"] = datas.dt.strftime("%Y-%m-%d")
+
+    # tarifas que não foram lançadas no ledger
+    tarifas = pd.DataFrame({"data": inicio.isoformat(), "valor": -12.90, "descricao": "TARIFA"}, index=range(12))
+    extrato = pd.concat([extrato, tarifas]).sort_values("data", kind="stable").reset_index(drop=True)
+    saldo_inicial = db.load_saldo_banco(BANCO, antes_de=inicio.isoformat())
+    extrato["saldo"] = (saldo_inicial + extrato["valor"].cumsum()).round(2)
+    return extrato, len(ledger)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--janela", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        print(f"Gerando ledger sintético com {args.linhas:,} lançamentos...")
+        sintetico.gerar_ledger(args.linhas)
+
+        extrato, lancamentos = montar_extrato(args.janela)
+        inicio = time.perf_counter()
+        resultado = conciliar(extrato, BANCO, args.janela)
+        tempo = time.perf_counter() - inicio
+
+        print(f"extrato: {len(extrato):,} linhas · ledger ({BANCO}, 1 ano): {lancamentos:,} lançamentos")
+        print(f"pareados: {len(resultado['pares']):,} · só no extrato: {len(resultado['so_extrato']):,} · "
+              f"só no ledger: {len(resultado['so_ledger']):,} · dias com saldo divergente: {len(resultado['saldos']):,}")
+        print(f"tempo: {tempo:.3f}s")
+        db.roteador.fechar_tudo()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark de memória e tempo de `load_transacoes`.
+
+Compara o carregamento antigo (SELECT * com colunas object e `data` como texto) com o atual
+(tipos compactos) e com a projeção de colunas usada pelo Resumo.
+
+Uso: python benchmarks/bench_load_transacoes.py [--linhas 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+import sintetico  # ajusta o sys.path para src/
+import db
+
+
+def _antigo():
+    # comportamento anterior: SELECT * sem tipos, datas reconvertidas pelo chamador
+    conn = db.get_connection()
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(db.COLUNAS_TRANSACOES)} FROM transacoes WHERE excluido = 0 ORDER BY data DESC, id DESC",
+        conn
+    )
+    conn.close()
+    return df
+
+
+CENARIOS = [
+    ("SELECT * (object)", _antigo),
+    ("load_transacoes()", lambda: db.load_transacoes()),
+    ("load_transacoes(columns=resumo)", lambda: db.load_transacoes(columns=["tipo", "valor", "categoria", "subcategoria"])),
+]
+
+
+def medir(func, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df = func()
+        tempos.append(time.perf_counter() - inicio)
+    return df.memory_usage(deep=True).sum(), min(tempos), len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        print(f"Gerando ledger sintético com {args.linhas:,} lançamentos...")
+        sintetico.gerar_ledger(args.linhas)
+
+        base = None
+        print(f"{'cenário':<34}{'linhas':>10}{'memória (MB)':>15}{'redução':>10}{'tempo (s)':>12}")
+        for nome, func in CENARIOS:
+            memoria, tempo, linhas = medir(func, args.repeticoes)
+            base = base or memoria
+            print(f"{nome:<34}{linhas:>10,}{memoria / 2**20:>15.1f}{base / memoria:>9.1f}x{tempo:>12.3f}")
+        db.roteador.fechar_tudo()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Teste de carga com várias sessões simultâneas sobre o mesmo arquivo SQLite.
+
+Cada sessão é um `AppTest` do Streamlit rodando em seu próprio processo (o `AppTest`
+não suporta várias execuções simultâneas no mesmo processo), todas sobre o mesmo arquivo
+SQLite. As sessões alternam entre mudar o período do Resumo, adicionar lançamentos,
+excluir e desfazer exclusões em Lançamentos, contra um ledger sintético em uma pasta temporária.
+
+Ao final informa a latência dos reruns (p50/p95/máx por ação), os erros de banco
+ocupado/travado do SQLite, os demais erros e o pico de memória (RSS) de cada sessão.
+Roda localmente, sem rede.
+
+O `AppTest` não edita células do `st.data_editor`; a exclusão usa a mesma função que o
+botão "Excluir selecionados" (`delete_transacoes`) seguida do rerun da página.
+
+Uso: python benchmarks/carga_sessoes.py [--sessoes 8] [--acoes 20] [--linhas 100000]
+"""
+import argparse
+import calendar
+import os
+import random
+import sys
+import multiprocessing
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+import numpy as np
+
+import sintetico  # ajusta o sys.path para src/
+import db
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(sintetico.SRC, "app.py")
+PAGINA_LANCAMENTOS = "pages/1_lancamentos.py"
+
+# Peso de cada ação no sorteio
+ACOES = {"periodo": 4, "lancamento": 3, "exclusao": 2, "desfazer": 1}
+
+MESES = list(calendar.month_name)[1:]
+
+
+def _erro_de_trava(mensagem):
+    mensagem = str(mensagem).lower()
+    return "database is locked" in mensagem or "database is busy" in mensagem or "sqlite_busy" in mensagem
+
+
+def _pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+
+class Sessao:
+    """Uma sessão do navegador: um AppTest e a página em que ele está."""
+
+    def __init__(self, numero, timeout):
+        self.numero = numero
+        self.rnd = random.Random(numero)
+        self.app = AppTest.from_file(APP, default_timeout=timeout)
+        self.pagina = "app.py"
+        self.latencias = defaultdict(list)
+        self.erros = []
+
+    def _rodar(self, acao, func):
+        inicio = time.perf_counter()
+        try:
+            func()
+            self.erros += [str(e.value) for e in self.app.exception]
+        except Exception as e:
+            self.erros.append(f"{type(e).__name__}: {e}")
+        self.latencias[acao].append(time.perf_counter() - inicio)
+
+    def _ir_para(self, pagina):
+        if self.pagina != pagina:
+            self._rodar("navegacao", lambda: self.app.switch_page(pagina).run())
+            self.pagina = pagina
+
+    def _widget(self, lista, rotulo):
+        return next(w for w in lista if w.label == rotulo)
+
+    def periodo(self):
+        self._ir_para("app.py")
+        inicio = self.rnd.randrange(12)
+        fim = self.rnd.randrange(inicio, 12)
+        self._rodar("periodo", lambda: self._widget(self.app.select_slider, "🗓️ Período")
+                    .set_value((MESES[inicio], MESES[fim])).run())
+
+    def lancamento(self):
+        self._ir_para(PAGINA_LANCAMENTOS)
+        descricao = f"carga s{self.numero} {time.time_ns()}"
+
+        def enviar():
+            self._widget(self.app.selectbox, "Tipo").set_value("Receita")
+            self._widget(self.app.number_input, "Valor").set_value(round(self.rnd.uniform(10, 500), 2))
+            self._widget(self.app.text_input, "Descrição").set_value(descricao)
+            self._widget(self.app.button, "🚀 Adicionar lançamento").click().run()
+
+        self._rodar("lancamento", enviar)
+
+    def exclusao(self):
+        self._ir_para(PAGINA_LANCAMENTOS)
+        # exclui alguns lançamentos recentes, como se marcados na tabela
+        ids = db.load_transacoes(filters={"start": date.today().isoformat()}, columns=["id"])["id"].tolist()
+        alvo = self.rnd.sample(ids, min(len(ids), 3))
+
+        def excluir():
+            if alvo:
+                db.delete_transacoes(alvo)
+            self.app.run()
+
+        self._rodar("exclusao", excluir)
+
+    def desfazer(self):
+        self._ir_para(PAGINA_LANCAMENTOS)
+        botao = next((b for b in self.app.button if b.label.startswith("↩️ Desfazer exclusão")), None)
+        if botao is not None and not botao.disabled:
+            self._rodar("desfazer", lambda: botao.click().run())
+
+    def executar(self, acoes, barreira):
+        self._rodar("abertura", self.app.run)
+        barreira.wait()
+        nomes, pesos = zip(*ACOES.items())
+        for _ in range(acoes):
+            getattr(self, self.rnd.choices(nomes, pesos)[0])()
+
+
+def _processo_sessao(pasta, numero, acoes, timeout, barreira, resultados):
+    os.chdir(pasta)
+    sessao = Sessao(numero, timeout)
+    try:
+        sessao.executar(acoes, barreira)
+    except Exception as e:
+        sessao.erros.append(f"{type(e).__name__}: {e}")
+    resultados.put({
+        "latencias": dict(sessao.latencias),
+        "erros": sessao.erros,
+        "pico_rss": _pico_rss_mb(),
+    })
+
+
+def preparar_ledger(linhas):
+    print(f"Gerando ledger sintético com {linhas:,} lançamentos...")
+    sintetico.gerar_ledger(linhas)
+    categorias = {"Receita": sintetico.RECEITAS, "Investimento": sintetico.INVESTIMENTOS, "Banco": sintetico.BANCOS}
+    for categoria, subcategoria in sintetico.DESPESAS:
+        categorias.setdefault(categoria, []).append(subcategoria)
+    db.save_categorias(categorias)
+
+
+def relatorio(sessoes, duracao):
+    latencias = defaultdict(list)
+    erros = []
+    for sessao in sessoes:
+        for acao, tempos in sessao["latencias"].items():
+            latencias[acao].extend(tempos)
+        erros.extend(sessao["erros"])
+
+    total = sum(len(t) for t in latencias.values())
+    print(f"\n{len(sessoes)} sessões · {total} reruns em {duracao:.1f}s ({total / duracao:.1f} reruns/s)")
+    print(f"{'ação':<12}{'reruns':>8}{'p50 (s)':>10}{'p95 (s)':>10}{'máx (s)':>10}")
+    for acao in ["abertura", "navegacao", *ACOES]:
+        tempos = np.array(latencias.get(acao, []))
+        if len(tempos):
+            p50, p95 = np.percentile(tempos, [50, 95])
+            print(f"{acao:<12}{len(tempos):>8}{p50:>10.3f}{p95:>10.3f}{tempos.max():>10.3f}")
+
+    travas = [e for e in erros if _erro_de_trava(e)]
+    print(f"\nerros de banco ocupado/travado (SQLite): {len(travas)}")
+    print(f"outros erros: {len(erros) - len(travas)}")
+    for erro in sorted(set(erros))[:10]:
+        print(f"  - {erro[:160]}")
+    picos = [s["pico_rss"] for s in sessoes if s["pico_rss"] is not None]
+    if picos:
+        print(f"pico de memória (RSS) por sessão: máx {max(picos):,.0f} MB · soma {sum(picos):,.0f} MB")
+    else:
+        print("pico de memória (RSS): n/d nesta plataforma")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessoes", type=int, default=8)
+    parser.add_argument("--acoes", type=int, default=20, help="ações por sessão")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--timeout", type=float, default=120, help="tempo máximo de um rerun (s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        os.chdir(pasta)
+        preparar_ledger(args.linhas)
+
+        # nenhuma conexão aberta atravessa para os processos das sessões
+        db.roteador.fechar_tudo()
+
+        contexto = multiprocessing.get_context("spawn")
+        barreira = contexto.Barrier(args.sessoes)
+        resultados = contexto.Queue()
+        processos = [
+            contexto.Process(target=_processo_sessao, args=(pasta, i, args.acoes, args.timeout, barreira, resultados))
+            for i in range(args.sessoes)
+        ]
+        inicio = time.perf_counter()
+        for p in processos:
+            p.start()
+        sessoes = [resultados.get() for _ in processos]
+        duracao = time.perf_counter() - inicio
+        for p in processos:
+            p.join()
+        relatorio(sessoes, duracao)
+
+
+if __name__ == "__main__":
+    main()
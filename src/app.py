@@ -1,9 +1,20 @@
 import streamlit as st
 import pandas as pd
+import plotly.express as px
 from db import *
+from previsao import projetar_categorias, projetar_bancos
+from tarefas import retomar_jobs
+from componentes import selecionar_ledger
+from ledgers import em_cache
+from series import reduzir_series
+from moedas import converter, fatores, formatar, moedas_disponiveis, moedas_sem_cotacao, resumo_convertido, simbolo
 import calendar
 from datetime import date
 
+# Inicialização do banco de dados
+ledger = selecionar_ledger()
+init_db()
+retomar_jobs()
 
 # Configuração do app
 st.set_page_config(
@@ -52,7 +63,10 @@ with col1:
         st.markdown("<p style='text-align: center'><b>Menu</b></p>", unsafe_allow_html=True)
         st.page_link("app.py", label="Resumo", icon="🧮")
         st.page_link("pages/1_lancamentos.py", label="Lançamentos", icon="📥")
+        st.page_link("pages/3_conciliacao.py", label="Conciliação", icon="🔎")
         st.page_link("pages/2_settings.py", label="Configuração", icon="⚙️")
+        if ledger != "default":
+            st.caption(f"📒 Ledger: {ledger}")
 
     with st.container(border=True):
         st.markdown("<p style='text-align: center'><b>Sobre</b></p>", unsafe_allow_html=True)
@@ -74,14 +88,9 @@ with col1:
 with col2:
     with st.container(border=True):
         # Filtrar anos disponíveis ----------
-        df_all = load_transacoes()
-        if not df_all.empty:
-            df_all["data"] = pd.to_datetime(df_all["data"])
-            anos_disponiveis = sorted(df_all["data"].dt.year.unique().tolist())
-        else:
-            anos_disponiveis = [date.today().year]
+        anos_disponiveis = load_anos() or [date.today().year]
 
-        col21, col22, col23, col24 = st.columns([1, 25, 1, 5])
+        col21, col22, col23, col24, col25 = st.columns([1, 20, 1, 5, 5])
         
         with col22:
             month_names = list(calendar.month_name)[1:]  # janeiro..dezembro
@@ -94,26 +103,53 @@ with col2:
         with col24:
             ano_selecionado = st.selectbox(" Ano", anos_disponiveis, index=(anos_disponiveis.index(date.today().year) if date.today().year in anos_disponiveis else 0))
 
+        with col25:
+            # moeda em que todos os valores do resumo são exibidos
+            base = st.selectbox("💱 Moeda", moedas_disponiveis())
+
     ## --------- Carregar dados --------
     # construir start / end date
     start_date = f"{ano_selecionado}-{mes_inicio:02d}-01"
     last_day = calendar.monthrange(ano_selecionado, mes_fim)[1]
     end_date = f"{ano_selecionado}-{mes_fim:02d}-{last_day:02d}"
 
-    # carregar transações do período
-    df = load_transacoes(filters={"start": start_date, "end": end_date})
-    
+    # carregar transações do período (só as colunas usadas no resumo), convertidas para a moeda escolhida
+    df = load_transacoes(
+        filters={"start": start_date, "end": end_date},
+        columns=["tipo", "data", "valor", "moeda", "categoria", "subcategoria"]
+    )
+    df = converter(df, base)
 
-    if not df.empty:
-        df["data"] = pd.to_datetime(df["data"])
-    else:
-        # garantir df com colunas esperadas para evitar keyerrors depois
-        df = pd.DataFrame(columns=["id","tipo","data","valor","categoria","subcategoria","banco","id_transferencia","descricao"])
+    sem_cotacao = moedas_sem_cotacao(load_moedas_banco().values())
+    if sem_cotacao:
+        st.warning(f"Sem cotação cadastrada para {', '.join(sem_cotacao)}: esses lançamentos ficam fora dos totais "
+                   "convertidos. Importe as cotações em Configuração → Moedas e Câmbio.")
 
     # carregar categorias e alvo
     alvo = load_alvo(default_values)
     categorias = load_categorias(default_categorias)
 
+    # projeções a partir do resumo mensal pré-agregado (cache do ledger, limpo a cada gravação):
+    # categorias na moeda escolhida, bancos na moeda de cada banco; até o fim do período e do ano
+    inicio_ano, fim_ano = f"{ano_selecionado}-01-01", f"{ano_selecionado}-12-31"
+
+    def calcular_projecoes():
+        resumo = load_resumo_mensal(filters={"end": fim_ano})
+        categorias_base = resumo_convertido(base, filters={"end": fim_ano})
+        # saldo de cada banco com tudo o que foi lançado até o fim do ano (base da projeção anual)
+        saldo_ano = resumo[resumo["banco"] != ""].groupby(["banco", "moeda"])["total"].sum()
+        return (
+            projetar_categorias(categorias_base, start_date, end_date),
+            projetar_bancos(resumo, start_date, end_date),
+            projetar_categorias(categorias_base, inicio_ano, fim_ano),
+            projetar_bancos(resumo, inicio_ano, fim_ano),
+            saldo_ano,
+        )
+
+    proj_categorias, proj_bancos, proj_categorias_ano, proj_bancos_ano, saldo_ano = em_cache(
+        ("projecoes", start_date, end_date, base, date.today()), calcular_projecoes
+    )
+
     # Valores resumo ----------
     col31, col32, col33, col34 = st.columns(4)
 
@@ -123,7 +159,7 @@ with col2:
             total_receita = df.loc[df["tipo"] == "Receita", "valor"].sum() if not df.empty else 0.0
 
             st.markdown("💰 Receitas")
-            st.markdown(f"<p style='text-align: right; font-size: 34px; line-height: 0.5;'>R$ {total_receita:,.2f}</p>", unsafe_allow_html=True) #color: #00B050
+            st.markdown(f"<p style='text-align: right; font-size: 34px; line-height: 0.5;'>{formatar(total_receita, base)}</p>", unsafe_allow_html=True) #color: #00B050
 
     with col32:
         with st.container(border=True):
@@ -131,7 +167,7 @@ with col2:
             total_despesas = - df.loc[df["tipo"].isin(["Despesa", "Investimento"]), "valor"].sum() if not df.empty else 0.0
 
             st.markdown("💸 Despesas")
-            st.markdown(f"<p style='text-align: right; font-size: 34px; line-height: 0.5;'>R$ {total_despesas:,.2f}</p>", unsafe_allow_html=True) #color: #FF0000
+            st.markdown(f"<p style='text-align: right; font-size: 34px; line-height: 0.5;'>{formatar(total_despesas, base)}</p>", unsafe_allow_html=True) #color: #FF0000
     
     with col33:
         with st.container(border=True):
@@ -147,15 +183,15 @@ with col2:
             saldo_periodo = df["valor"].sum() if not df.empty else 0.0
 
             st.markdown("📊 Saldo")
-            st.markdown(f"<p style='text-align: right; font-size: 34px; line-height: 0.5;'>R$ {saldo_periodo:,.2f}</p>", unsafe_allow_html=True)
+            st.markdown(f"<p style='text-align: right; font-size: 34px; line-height: 0.5;'>{formatar(saldo_periodo, base)}</p>", unsafe_allow_html=True)
 
     col41, col42, col43 = st.columns([1, 2, 1])
 
     with col41:
         receitas = df[df["tipo"] == "Receita"]
         if not receitas.empty:
-            rec_by_cat = receitas.groupby("categoria")["valor"].sum().reset_index().sort_values("valor", ascending=False)
-            rec_by_cat["valor_fmt"] = rec_by_cat["valor"].map(lambda x: f"R$ {x:,.2f}")
+            rec_by_cat = receitas.groupby("categoria", observed=True)["valor"].sum().reset_index().sort_values("valor", ascending=False)
+            rec_by_cat["valor_fmt"] = rec_by_cat["valor"].map(lambda x: formatar(x, base))
             st.dataframe(
                 rec_by_cat[["categoria", "valor_fmt"]]
                     .rename(columns={"categoria": "Categoria", "valor_fmt": "Valor"}),
@@ -178,8 +214,10 @@ with col2:
 
             rows.append({
                 "Categoria": cat,
-                "Valor Gasto (R$)": round(gasto_valor, 2),
-                "Valor Alvo (R$)": round(alvo_valor, 2),
+                "Valor Gasto": round(gasto_valor, 2),
+                "Valor Projetado": round(float(proj_categorias.get(cat, gasto_valor)), 2),
+                "Valor Projetado Ano": round(float(proj_categorias_ano.get(cat, 0.0)), 2),
+                "Valor Alvo": round(alvo_valor, 2),
                 "Percentual Alvo (%)": perc,
                 "% Receita Usado": None if pct_usado_total is None else round(pct_usado_total, 2)
             })
@@ -208,8 +246,10 @@ with col2:
 
         if not budget_df.empty:
             display_df = budget_df.copy()
-            display_df["Gasto"] = display_df["Valor Gasto (R$)"].map(lambda x: f"R$ {x:,.2f}")
-            display_df["Alvo"] = display_df["Valor Alvo (R$)"].map(lambda x: f"R$ {x:,.2f}")
+            display_df["Gasto"] = display_df["Valor Gasto"].map(lambda x: formatar(x, base))
+            display_df["Alvo"] = display_df["Valor Alvo"].map(lambda x: formatar(x, base))
+            display_df["Projeção"] = display_df["Valor Projetado"].map(lambda x: formatar(x, base))
+            display_df[f"Projeção {ano_selecionado}"] = display_df["Valor Projetado Ano"].map(lambda x: formatar(x, base))
 
             display_df["Utilizado / Alvo (%)"] = display_df.apply(
                 lambda row: barra_progresso(row["% Receita Usado"], row["Percentual Alvo (%)"]),
@@ -217,19 +257,37 @@ with col2:
             )
 
             st.dataframe(
-                display_df[["Categoria", "Gasto", "Alvo", "Utilizado / Alvo (%)"]],
+                display_df[["Categoria", "Gasto", "Projeção", f"Projeção {ano_selecionado}", "Alvo", "Utilizado / Alvo (%)"]],
                 use_container_width=True,
                 hide_index=True
             )
 
     with col43:
-        df_bancos = load_transacoes(filters={"end": end_date})
+        df_bancos = load_transacoes(filters={"end": end_date}, columns=["banco", "valor", "moeda"])
         if not df_bancos.empty:
-            df_bancos["data"] = pd.to_datetime(df_bancos["data"])
-            bal = df_bancos.groupby("banco")["valor"].sum().reset_index().dropna(subset=["banco"])
+            bal = df_bancos.groupby(["banco", "moeda"], observed=True)["valor"].sum().reset_index().dropna(subset=["banco"])
             if not bal.empty:
-                bal["Saldo"] = bal["valor"].map(lambda x: f"R$ {x:,.2f}")
-                st.dataframe(bal[["banco","Saldo"]].rename(columns={"banco":"Banco"}), use_container_width=True, hide_index=True)
+                # saldo na moeda do próprio banco
+                moedas_bal = bal["moeda"].astype(str)
+                bal["Saldo"] = [formatar(v, m) for v, m in zip(bal["valor"], moedas_bal)]
+                colunas = ["banco", "Saldo"]
+                if (moedas_bal != base).any():
+                    # convertido pela cotação vigente no fim do período
+                    convertido = bal["valor"].to_numpy() * fatores(moedas_bal, [end_date] * len(bal), base)
+                    bal[f"Em {base}"] = [formatar(v, base) if pd.notna(v) else "sem cotação" for v in convertido]
+                    colunas.append(f"Em {base}")
+                if not proj_bancos.empty:
+                    # saldo + fluxo previsto até o fim do período
+                    projecao = bal["valor"] + bal["banco"].astype(str).map(proj_bancos).fillna(0.0)
+                    bal["Projeção"] = [formatar(v, m) for v, m in zip(projecao, moedas_bal)]
+                    colunas.append("Projeção")
+                if not proj_bancos_ano.empty:
+                    # saldo atual + fluxo previsto até 31/12 do ano selecionado
+                    chaves = pd.MultiIndex.from_arrays([bal["banco"].astype(str), moedas_bal])
+                    projecao_ano = saldo_ano.reindex(chaves, fill_value=0.0).to_numpy() + bal["banco"].astype(str).map(proj_bancos_ano).fillna(0.0).to_numpy()
+                    bal[f"Projeção {ano_selecionado}"] = [formatar(v, m) for v, m in zip(projecao_ano, moedas_bal)]
+                    colunas.append(f"Projeção {ano_selecionado}")
+                st.dataframe(bal[colunas].rename(columns={"banco":"Banco"}), use_container_width=True, hide_index=True)
             else:
                 st.info("Nenhum lançamento com banco registrado.")
         else:
@@ -237,6 +295,29 @@ with col2:
 
     st.divider()
 
+    # -------------------------------
+    # SALDO AO LONGO DO TEMPO
+    # -------------------------------
+    st.markdown("#### 📈 Saldo ao Longo do Período")
+
+    # acumulado no SQLite e reduzido a um número fixo de pontos por série antes de ir ao navegador
+    saldo_diario = em_cache(
+        ("saldo_diario", start_date, end_date, base),
+        lambda: reduzir_series(load_saldo_diario(filters={"start": start_date, "end": end_date}, base=base), "data", "saldo", "banco")
+    )
+    if not saldo_diario.empty:
+        fig = px.line(
+            saldo_diario, x="data", y="saldo", color="banco",
+            labels={"data": "Data", "saldo": f"Saldo ({simbolo(base)})", "banco": "Banco"},
+            line_shape="hv"
+        )
+        fig.update_layout(legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5))
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("Nenhuma movimentação bancária no período selecionado.")
+
+    st.divider()
+
     # -------------------------------
     # DETALHAMENTO DO ORÇAMENTO
     # -------------------------------
@@ -252,17 +333,17 @@ with col2:
         
         # Agrupar por subcategoria
         tab = (
-            filtro.groupby("subcategoria")["valor"]
+            filtro.groupby("subcategoria", observed=True)["valor"]
             .sum()
             .reset_index()
             .sort_values("valor")
         )
 
-        tab["Valor (R$)"] = tab["valor"].map(lambda x: f"R$ {abs(x):,.2f}")
+        tab["Valor"] = tab["valor"].map(lambda x: formatar(abs(x), base))
         tab = tab.rename(columns={"subcategoria": "Subcategoria"})
         
         st.dataframe(
-            tab[["Subcategoria", "Valor (R$)"]],
+            tab[["Subcategoria", "Valor"]],
             use_container_width=True,
             hide_index=True
         )
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+
+from ledgers import ledger_atual, roteador
+
+PASTA_BACKUPS = "data/backups"
+
+# Quantidade de cópias mantidas por ledger (as mais antigas são apagadas)
+RETENCAO = 7
+
+# Intervalo entre backups automáticos
+INTERVALO_HORAS = 24
+
+# Cópia em passos de ~1 MB (páginas de 4 KB), com uma pausa entre eles para não
+# competir com as sessões pelo disco
+PAGINAS_POR_PASSO = 256
+PAUSA_ENTRE_PASSOS = 0.005
+
+# Escritas de outras conexões reiniciam a cópia; depois de tantas tentativas a cópia
+# é feita em um único passo (um só snapshot de leitura, que no modo WAL não bloqueia escritas)
+MAX_REINICIOS = 3
+
+_FORMATO_DATA = "%Y%m%d-%H%M%S"
+
+
+class _Reiniciado(Exception):
+    pass
+
+
+def pasta_backups(ledger=None):
+    return os.path.join(PASTA_BACKUPS, ledger or ledger_atual())
+
+
+def listar_backups(ledger=None):
+    """Cópias existentes do ledger, da mais recente para a mais antiga: lista de dicts (arquivo, data, tamanho)."""
+    pasta = pasta_backups(ledger)
+    if not os.path.isdir(pasta):
+        return []
+    backups = []
+    for nome in os.listdir(pasta):
+        if not nome.endswith(".db"):
+            continue
+        try:
+            data = datetime.strptime(nome[-len("YYYYmmdd-HHMMSS.db"):-3], _FORMATO_DATA)
+        except ValueError:
+            continue
+        caminho = os.path.join(pasta, nome)
+        backups.append({"arquivo": caminho, "data": data, "tamanho": os.path.getsize(caminho)})
+    return sorted(backups, key=lambda b: b["data"], reverse=True)
+
+
+def ultimo_backup(ledger=None):
+    backups = listar_backups(ledger)
+    return backups[0]["data"] if backups else None
+
+
+def _copiar(origem, destino, progresso):
+    # cópia página a página; aborta se o banco for alterado por outra conexão no meio dela
+    restantes = [None]
+
+    def passo(status, faltam, total):
+        if restantes[0] is not None and faltam > restantes[0]:
+            raise _Reiniciado()
+        restantes[0] = faltam
+        if progresso:
+            progresso(total - faltam, total)
+
+    origem.backup(destino, pages=PAGINAS_POR_PASSO, progress=passo, sleep=PAUSA_ENTRE_PASSOS)
+
+
+def verificar_backup(arquivo):
+    """True se a cópia passa no `PRAGMA integrity_check`."""
+    conn = sqlite3.connect(arquivo)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchall() == [("ok",)]
+    finally:
+        conn.close()
+
+
+def aplicar_retencao(ledger=None, manter=RETENCAO):
+    removidos = 0
+    for backup in listar_backups(ledger)[manter:]:
+        os.remove(backup["arquivo"])
+        removidos += 1
+    return removidos
+
+
+def fazer_backup(ledger=None, progresso=None):
+    """
+    Copia o ledger (por padrão, o atual) para data/backups/<ledger>/ com a API de backup do SQLite,
+    sem interromper o app: a origem só é lida (nenhuma trava de escrita é tomada) e a
+    cópia avança em passos pequenos. A cópia é verificada antes de entrar na rotação.
+
+    `progresso(feito, total)` recebe as páginas copiadas. Retorna um dict com
+    arquivo, tamanho, paginas, segundos, reinicios e removidos (cópias antigas apagadas).
+    """
+    ledger = ledger or ledger_atual()
+    pasta = pasta_backups(ledger)
+    os.makedirs(pasta, exist_ok=True)
+    arquivo = os.path.join(pasta, f"{ledger}-{datetime.now().strftime(_FORMATO_DATA)}.db")
+    # nome temporário único: dois processos do servidor podem copiar o mesmo ledger ao mesmo tempo
+    parcial = f"{arquivo}.{uuid.uuid4().hex}.parcial"
+
+    inicio = time.perf_counter()
+    # a origem é o próprio ledger pedido, não o do contexto atual
+    origem = roteador.conectar(ledger)
+    reinicios = 0
+    try:
+        while True:
+            destino = sqlite3.connect(parcial)
+            try:
+                if reinicios < MAX_REINICIOS:
+                    _copiar(origem, destino, progresso)
+                else:
+                    origem.backup(destino)
+                paginas = destino.execute("PRAGMA page_count").fetchone()[0]
+                # a cópia é um arquivo único e autônomo (sem -wal)
+                destino.execute("PRAGMA journal_mode = DELETE")
+                break
+            except _Reiniciado:
+                reinicios += 1
+            finally:
+                destino.close()
+    except BaseException:
+        if os.path.exists(parcial):
+            os.remove(parcial)
+        raise
+    finally:
+        origem.close()
+
+    if not verificar_backup(parcial):
+        os.remove(parcial)
+        raise RuntimeError(f"Backup de {ledger} falhou na verificação de integridade.")
+    os.replace(parcial, arquivo)
+
+    return {
+        "arquivo": arquivo,
+        "tamanho": os.path.getsize(arquivo),
+        "paginas": paginas,
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "reinicios": reinicios,
+        "removidos": aplicar_retencao(ledger),
+    }
+
+
+def backup_pendente(ledger=None, intervalo_horas=INTERVALO_HORAS):
+    """True se o ledger ainda não tem cópia ou a mais recente é mais antiga que o intervalo."""
+    ultimo = ultimo_backup(ledger)
+    return ultimo is None or (datetime.now() - ultimo).total_seconds() >= intervalo_horas * 3600
@@ -0,0 +1,137 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from db import load_regras, load_historico_classificacao
+from ledgers import em_cache
+
+# Tipos aceitos conforme o sinal do valor (saídas podem ser despesa ou investimento)
+TIPOS_POR_SINAL = {True: ("Receita",), False: ("Despesa", "Investimento")}
+
+_NAO_LETRAS = re.compile(r"[\d\W_]+")
+
+
+def normalizar_descricao(texto):
+    """Chave do histórico: minúsculas, sem números e pontuação (ex.: "PADARIA X 1234" -> "padaria x")."""
+    return " ".join(_NAO_LETRAS.sub(" ", str(texto).casefold()).split())
+
+
+def _regex_trie(padroes):
+    """
+    Expressão regular equivalente a `padrao1|padrao2|...`, mas montada como árvore de prefixos:
+    o motor de regex percorre cada descrição sem testar as regras uma a uma.
+    """
+    raiz = {}
+    for padrao in padroes:
+        no = raiz
+        for ch in padrao:
+            no = no.setdefault(ch, {})
+        no[""] = True
+
+    def montar(no):
+        alternativas, folhas = [], []
+        for ch in sorted(k for k in no if k):
+            sub = montar(no[ch])
+            if sub:
+                alternativas.append(re.escape(ch) + sub)
+            else:
+                folhas.append(re.escape(ch))
+        if folhas:
+            alternativas.append(folhas[0] if len(folhas) == 1 else "[" + "".join(folhas) + "]")
+        if not alternativas:
+            return ""
+        padrao = alternativas[0] if len(alternativas) == 1 else "(?:" + "|".join(alternativas) + ")"
+        if "" in no:
+            # fim de um padrão que também é prefixo de outro: o guloso prefere o mais longo
+            padrao = "(?:" + padrao + ")?"
+        return padrao
+
+    return re.compile(montar(raiz), re.IGNORECASE)
+
+
+class Classificador:
+    """
+    Sugere tipo/categoria/subcategoria/banco a partir da descrição.
+
+    Todas as regras são compiladas em uma única expressão regular em forma de árvore de
+    prefixos, então cada descrição é varrida uma só vez, em tempo proporcional ao seu
+    tamanho e não à quantidade de regras. Sem regra aplicável, usa a classificação mais
+    frequente da mesma descrição no histórico.
+    """
+
+    def __init__(self, regras, historico):
+        regras = [r for r in regras if str(r.get("padrao") or "").strip()]
+        self._regras = {}
+        for regra in regras:
+            # com padrões repetidos, vale a primeira regra cadastrada
+            self._regras.setdefault(regra["padrao"].strip().lower(), regra)
+        self._regex = _regex_trie(self._regras) if self._regras else None
+
+        self._aprendido = {}
+        if not historico.empty:
+            hist = historico.assign(chave=historico["descricao"].map(normalizar_descricao))
+            hist = hist[hist["chave"] != ""]
+            # classificação mais frequente para cada descrição normalizada
+            hist = hist.groupby(["chave", "tipo", "categoria", "subcategoria"], dropna=False)["qtd"].sum().reset_index()
+            hist = hist.sort_values("qtd", ascending=False).drop_duplicates("chave")
+            for chave, tipo, categoria, subcategoria in zip(hist["chave"], hist["tipo"], hist["categoria"], hist["subcategoria"]):
+                self._aprendido[chave] = {
+                    "tipo": tipo,
+                    "categoria": categoria,
+                    "subcategoria": subcategoria if isinstance(subcategoria, str) else None,
+                    "banco": None,
+                    "origem": "histórico",
+                }
+
+    def classificar(self, descricao):
+        """Sugestão para uma descrição (dict com tipo, categoria, subcategoria, banco, origem) ou None."""
+        if not descricao:
+            return None
+        if self._regex is not None:
+            achado = self._regex.search(descricao)
+            regra = self._regras.get(achado.group(0).lower()) if achado else None
+            if regra:
+                return {
+                    "tipo": regra["tipo"],
+                    "categoria": regra["categoria"],
+                    "subcategoria": regra.get("subcategoria") or None,
+                    "banco": regra.get("banco") or None,
+                    "origem": f"regra “{regra['padrao']}”",
+                }
+        return self._aprendido.get(normalizar_descricao(descricao))
+
+    def classificar_series(self, descricoes, valores=None):
+        """
+        Classifica uma coluna inteira de descrições. Cada descrição distinta é avaliada uma vez.
+        Com `valores`, só aceita sugestões compatíveis com o sinal (entrada/saída) de cada linha.
+        Retorna um DataFrame alinhado ao índice com tipo, categoria, subcategoria e banco (NaN sem sugestão).
+        """
+        descricoes = pd.Series(descricoes).fillna("").astype(str)
+        codigos, unicas = pd.factorize(descricoes)
+        sugestoes = pd.DataFrame(
+            [self.classificar(d) or {} for d in unicas],
+            columns=["tipo", "categoria", "subcategoria", "banco"]
+        )
+        if len(unicas) == 0:
+            return sugestoes.reindex(descricoes.index)
+
+        resultado = sugestoes.iloc[codigos].set_index(descricoes.index)
+        if valores is not None:
+            positivos = np.asarray(valores) > 0
+            compativel = np.where(
+                positivos,
+                resultado["tipo"].isin(TIPOS_POR_SINAL[True]),
+                resultado["tipo"].isin(TIPOS_POR_SINAL[False]),
+            )
+            resultado = resultado.where(pd.Series(compativel, index=resultado.index), axis=0)
+        return resultado
+
+
+def carregar_classificador(ledger=None):
+    """Classificador do ledger atual, em cache até a próxima gravação."""
+    return em_cache(
+        "classificador",
+        lambda: Classificador(load_regras().to_dict("records"), load_historico_classificacao()),
+        ledger
+    )
@@ -0,0 +1,73 @@
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from db import load_jobs
+from ledgers import definir_resolvedor, ledger_atual, validar_nome
+from tarefas import STATUS_ATIVOS
+
+
+def _ledger_da_sessao():
+    # fora de uma execução de script (ex.: threads de jobs) não há sessão
+    if get_script_run_ctx() is None:
+        return None
+    return st.session_state.get("ledger")
+
+
+definir_resolvedor(_ledger_da_sessao)
+
+
+def selecionar_ledger():
+    """
+    Associa a sessão ao ledger pedido na URL (`?ledger=<nome>`); a escolha fica no
+    session_state e vale para todas as páginas da sessão.
+    """
+    nome = st.query_params.get("ledger")
+    if nome and nome != st.session_state.get("ledger"):
+        try:
+            st.session_state["ledger"] = validar_nome(nome)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+    return ledger_atual()
+
+ROTULOS_JOBS = {
+    "importar_extrato": "📄 Importação de extrato",
+    "reconstruir_resumo": "🧮 Reconstrução do resumo mensal",
+    "reindexar": "🗂️ Reindexação do banco",
+    "classificar_pendentes": "🧠 Classificação automática",
+    "backup": "💾 Backup",
+    "arquivar": "🗄️ Arquivamento de excluídos",
+}
+
+
+def _progresso_job(job):
+    rotulo = ROTULOS_JOBS.get(job["tipo"], job["tipo"])
+    if job["status"] == "erro":
+        st.error(f"{rotulo}: {job['mensagem']}")
+    elif job["status"] == "concluido":
+        st.success(f"{rotulo}: {job['mensagem'] or 'concluído'}")
+    else:
+        fracao = job["progresso"] / job["total"] if job["total"] else 0.0
+        st.progress(min(fracao, 1.0), text=f"{rotulo} ({job['progresso']:,} / {job['total']:,})")
+
+
+@st.fragment(run_every="2s")
+def _painel_ativo(tipos):
+    ativos = load_jobs(status=STATUS_ATIVOS, tipos=tipos)
+    if not ativos:
+        # terminou: recarrega a página inteira para refletir os novos dados
+        st.rerun()
+    for job in ativos:
+        _progresso_job(job)
+
+
+def painel_jobs(tipos=None, recentes=1):
+    """
+    Mostra o andamento dos jobs em segundo plano. Enquanto houver job ativo, o painel
+    se atualiza sozinho (sem rerodar a página); depois mostra o resultado do(s) mais recente(s).
+    """
+    if load_jobs(status=STATUS_ATIVOS, tipos=tipos, limite=1):
+        _painel_ativo(tipos)
+        return
+    for job in load_jobs(tipos=tipos, limite=recentes):
+        _progresso_job(job)
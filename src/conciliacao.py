@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from db import load_conciliacao, load_saldo_banco
+from importacao import ler_extrato
+
+# Tolerância padrão entre a data do extrato e a do lançamento (compensação, fim de semana)
+JANELA_DIAS = 3
+
+# Diferença de saldo abaixo de meio centavo é arredondamento
+TOLERANCIA_SALDO = 0.005
+
+
+def _centavos(valores):
+    return np.rint(np.asarray(valores, dtype=np.float64) * 100).astype(np.int64)
+
+
+def _dias(datas):
+    return pd.to_datetime(datas, format="ISO8601").to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def carregar_extrato(arquivo):
+    """Extrato inteiro normalizado (mesmo formato aceito na importação), na ordem do arquivo."""
+    lotes = [lote for _, lote in ler_extrato(arquivo)]
+    if not lotes:
+        return pd.DataFrame(columns=["data", "valor", "descricao"])
+    return pd.concat(lotes, ignore_index=True)
+
+
+def _parear_exatos(valor_e, dia_e, valor_l, dia_l):
+    # hash join em (valor, dia, n-ésima repetição): linhas iguais pareiam uma a uma
+    e = pd.DataFrame({"v": valor_e, "d": dia_e, "pos_e": np.arange(len(valor_e))})
+    l = pd.DataFrame({"v": valor_l, "d": dia_l, "pos_l": np.arange(len(valor_l))})
+    e["n"] = e.groupby(["v", "d"]).cumcount()
+    l["n"] = l.groupby(["v", "d"]).cumcount()
+    pares = e.merge(l, on=["v", "d", "n"])
+    return pares["pos_e"].to_numpy(), pares["pos_l"].to_numpy()
+
+
+def _parear_janela(valor_e, dia_e, valor_l, dia_l, janela):
+    # sort-merge: os dois lados ordenados por (valor, dia) e percorridos uma única vez
+    ordem_e = np.lexsort((dia_e, valor_e))
+    ordem_l = np.lexsort((dia_l, valor_l))
+    ve, de = valor_e[ordem_e].tolist(), dia_e[ordem_e].tolist()
+    vl, dl = valor_l[ordem_l].tolist(), dia_l[ordem_l].tolist()
+
+    pares_e, pares_l = [], []
+    i = j = 0
+    while i < len(ve) and j < len(vl):
+        if vl[j] < ve[i] or (vl[j] == ve[i] and dl[j] < de[i] - janela):
+            j += 1          # lançamento sem linha correspondente no extrato
+        elif vl[j] > ve[i] or dl[j] > de[i] + janela:
+            i += 1          # linha do extrato sem lançamento correspondente
+        else:
+            pares_e.append(i)
+            pares_l.append(j)
+            i += 1
+            j += 1
+    return ordem_e[pares_e], ordem_l[pares_l]
+
+
+def parear(extrato, ledger, janela=JANELA_DIAS):
+    """
+    Pareia linhas do extrato com lançamentos do ledger de mesmo valor (em centavos) e
+    datas a até `janela` dias. Primeiro pareia as datas exatas por hash; o restante passa
+    por um sort-merge linear, sem comparar todas as linhas contra todas.
+    Retorna dois arrays alinhados de posições (extrato, ledger).
+    """
+    valor_e, dia_e = _centavos(extrato["valor"]), _dias(extrato["data"])
+    valor_l, dia_l = _centavos(ledger["valor"]), _dias(ledger["data"])
+
+    pos_e, pos_l = _parear_exatos(valor_e, dia_e, valor_l, dia_l)
+    if janela > 0:
+        resto_e = np.setdiff1d(np.arange(len(extrato)), pos_e)
+        resto_l = np.setdiff1d(np.arange(len(ledger)), pos_l)
+        jan_e, jan_l = _parear_janela(valor_e[resto_e], dia_e[resto_e], valor_l[resto_l], dia_l[resto_l], janela)
+        pos_e = np.concatenate([pos_e, resto_e[jan_e]])
+        pos_l = np.concatenate([pos_l, resto_l[jan_l]])
+    return pos_e.astype(np.int64), pos_l.astype(np.int64)
+
+
+def comparar_saldos(extrato, ledger, saldo_inicial):
+    """
+    Dias em que o saldo informado no extrato (coluna `saldo`, último valor do dia) difere
+    do saldo do banco no ledger ao fim do mesmo dia.
+    """
+    if "saldo" not in extrato.columns or extrato["saldo"].isna().all():
+        return pd.DataFrame(columns=["data", "saldo_extrato", "saldo_ledger", "diferenca"])
+
+    diario = extrato.dropna(subset=["saldo"]).groupby("data", sort=True)["saldo"].last()
+    dias_ledger = _dias(ledger["data"])
+    acumulado = saldo_inicial + np.cumsum(ledger["valor"].to_numpy())
+    # saldo do ledger ao fim de cada dia do extrato: último lançamento até aquele dia
+    fim_do_dia = np.searchsorted(dias_ledger, _dias(diario.index), side="right") - 1
+    saldo_ledger = np.where(fim_do_dia >= 0, acumulado[np.maximum(fim_do_dia, 0)], saldo_inicial)
+
+    saldos = pd.DataFrame({
+        "data": diario.index,
+        "saldo_extrato": diario.to_numpy(),
+        "saldo_ledger": np.round(saldo_ledger, 2),
+    })
+    saldos["diferenca"] = (saldos["saldo_extrato"] - saldos["saldo_ledger"]).round(2)
+    return saldos[saldos["diferenca"].abs() > TOLERANCIA_SALDO].reset_index(drop=True)
+
+
+def conciliar(extrato, banco, janela=JANELA_DIAS):
+    """
+    Confere um extrato normalizado contra os lançamentos do banco no mesmo período
+    (ampliado pela janela). Retorna um dict com:
+    `pares`, `so_extrato`, `so_ledger`, `saldos` (DataFrames) e `totais` (dict).
+    """
+    if extrato.empty:
+        raise ValueError("Extrato sem linhas válidas.")
+
+    datas = pd.to_datetime(extrato["data"], format="ISO8601")
+    inicio, fim = datas.min(), datas.max()
+    inicio_ledger = (inicio - timedelta(days=janela)).date().isoformat()
+    fim_ledger = (fim + timedelta(days=janela)).date().isoformat()
+    ledger = load_conciliacao(banco, inicio_ledger, fim_ledger)
+
+    pos_e, pos_l = parear(extrato, ledger, janela)
+    ordem = np.argsort(pos_e, kind="stable")
+    pos_e, pos_l = pos_e[ordem], pos_l[ordem]
+
+    lado_e = extrato.iloc[pos_e].reset_index(drop=True)
+    lado_l = ledger.iloc[pos_l].reset_index(drop=True)
+    pares = pd.DataFrame({
+        "data_extrato": lado_e["data"],
+        "descricao_extrato": lado_e["descricao"],
+        "valor": lado_e["valor"],
+        "data_ledger": lado_l["data"],
+        "descricao_ledger": lado_l["descricao"],
+        "id": lado_l["id"],
+        "conciliado": lado_l["conciliado_em"].notna(),
+    })
+    pares["dias"] = (_dias(pares["data_ledger"]) - _dias(pares["data_extrato"])).astype(int)
+
+    so_extrato = extrato.drop(extrato.index[pos_e])[["data", "valor", "descricao"]].reset_index(drop=True)
+    so_ledger = ledger.drop(ledger.index[pos_l]).reset_index(drop=True)
+    # o ledger foi lido com folga de `janela` dias; sobras fora do período do extrato não são pendências
+    no_periodo = so_ledger["data"].between(inicio.date().isoformat(), fim.date().isoformat())
+    so_ledger = so_ledger[no_periodo].reset_index(drop=True)
+
+    no_extrato = ledger["data"].between(inicio.date().isoformat(), fim.date().isoformat())
+    saldo_inicial = load_saldo_banco(banco, antes_de=inicio_ledger)
+    totais = {
+        "inicio": inicio.date(),
+        "fim": fim.date(),
+        "extrato": round(float(extrato["valor"].sum()), 2),
+        "ledger": round(float(ledger.loc[no_extrato, "valor"].sum()), 2),
+    }
+    totais["diferenca"] = round(totais["extrato"] - totais["ledger"], 2)
+
+    return {
+        "banco": banco,
+        "pares": pares,
+        "so_extrato": so_extrato,
+        "so_ledger": so_ledger,
+        "saldos": comparar_saldos(extrato, ledger, saldo_inicial),
+        "totais": totais,
+    }
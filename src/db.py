@@ -1,16 +1,36 @@
 import sqlite3
 import os
+import json
+import hashlib
+import re
+from datetime import date
 import pandas as pd
+from ledgers import roteador, ledger_atual, invalidar_cache, DB_PADRAO
 
-DB_FILE = "data/budget.db"
+# Arquivo do ledger padrão (outros ledgers ficam em data/ledgers/<nome>.db)
+DB_FILE = DB_PADRAO
+
+# Categoria dos lançamentos importados sem classificação
+CATEGORIA_A_CLASSIFICAR = "A classificar"
+
+# Categorias das despesas (as de receita são as cadastradas; investimento tem uma só)
+GRUPOS_DESPESA = ["Custos Fixos", "Custos Variáveis", "Metas", "Lazer", "Educação"]
+
+# Moeda dos valores gravados sem moeda explícita e referência das cotações em fx_rates
+MOEDA_PADRAO = "BRL"
 
 def get_connection():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect(DB_FILE)
-    return conn
+    # conexão do pool do ledger da sessão/contexto atual; close() a devolve ao pool
+    return roteador.conectar(ledger_atual())
 
 def init_db():
+    # o esquema é preparado pelo roteador na primeira conexão de cada ledger
     conn = get_connection()
+    conn.close()
+
+
+@roteador.ao_preparar
+def _preparar_db(conn):
     cur = conn.cursor()
 
     # Orçamento alvo
@@ -46,7 +66,293 @@ def init_db():
     """)
 
     conn.commit()
+    migrar_db(conn)
+
+
+# -------- MIGRAÇÕES -------- #
+# Cada migração roda uma única vez, na ordem, controlada por PRAGMA user_version.
+
+def _migracao_resumo_mensal(cur):
+    # Resumo mensal pré-agregado (mantido por triggers a cada lançamento)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS resumo_mensal (
+        mes TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        subcategoria TEXT NOT NULL DEFAULT '',
+        banco TEXT NOT NULL DEFAULT '',
+        total REAL NOT NULL DEFAULT 0,
+        qtd INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (mes, tipo, categoria, subcategoria, banco)
+    )
+    """)
+
+
+def _migracao_jobs(cur):
+    # WAL: leituras das páginas não bloqueiam enquanto um job em segundo plano escreve
+    cur.execute("PRAGMA journal_mode = WAL")
+
+    # Jobs em segundo plano (importações, reconstruções, manutenção)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pendente',
+        parametros TEXT,
+        progresso INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        checkpoint TEXT,
+        mensagem TEXT,
+        criado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+        atualizado_em TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)")
+
+
+def _migracao_exclusao_logica(cur):
+    # Exclusão lógica: linhas excluídas ficam na tabela até serem restauradas
+    _adicionar_coluna(cur, "transacoes", "excluido", "INTEGER NOT NULL DEFAULT 0")
+    _adicionar_coluna(cur, "transacoes", "lote_exclusao", "INTEGER")
+
+    # Lotes de exclusão (log para desfazer)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS lotes_exclusao (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        criado_em TEXT DEFAULT CURRENT_TIMESTAMP,
+        qtd INTEGER NOT NULL DEFAULT 0,
+        desfeito INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # Índices parciais: consultas do dia a dia só enxergam as linhas ativas
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_ativas ON transacoes (data, id) WHERE excluido = 0")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_lote ON transacoes (lote_exclusao) WHERE lote_exclusao IS NOT NULL")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_transferencia ON transacoes (id_transferencia) WHERE id_transferencia IS NOT NULL")
+
+
+def _migracao_impressao(cur):
+    # Impressão digital do conteúdo de cada lançamento (deduplicação)
+    _adicionar_coluna(cur, "transacoes", "impressao", "TEXT")
+
+    _recalcular_impressoes(cur)
+
+
+def _recalcular_impressoes(cur):
+    # linhas ativas primeiro: duplicatas já existentes recebem ocorrências distintas e são mantidas
+    cur.execute("DROP INDEX IF EXISTS idx_transacoes_impressao")
+    rows = cur.execute("""
+        SELECT id, tipo, data, valor, banco, descricao FROM transacoes ORDER BY excluido, id
+    """).fetchall()
+    contagem = {}
+    updates = []
+    for id_, tipo, data, valor, banco, descricao in rows:
+        chave = _chave_transacao({"tipo": tipo, "data": data, "valor": valor, "banco": banco, "descricao": descricao})
+        ocorrencia = contagem.get(chave, 0)
+        contagem[chave] = ocorrencia + 1
+        updates.append((_hash_chave(chave, ocorrencia), id_))
+    cur.executemany("UPDATE transacoes SET impressao = ? WHERE id = ?", updates)
+
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transacoes_impressao ON transacoes (impressao)
+        WHERE excluido = 0 AND impressao IS NOT NULL
+    """)
+
+
+def _migracao_impressao_tipo(cur):
+    # O tipo passa a fazer parte da impressão digital (receita e despesa iguais não colidem)
+    _recalcular_impressoes(cur)
+
+
+def _migracao_regras(cur):
+    # Regras de classificação automática (texto da descrição -> categoria)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS regras_categoria (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        padrao TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        subcategoria TEXT,
+        banco TEXT
+    )
+    """)
+
+
+def _migracao_conciliacao(cur):
+    # Data em que o lançamento foi conferido contra o extrato do banco
+    _adicionar_coluna(cur, "transacoes", "conciliado_em", "TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_transacoes_banco_data ON transacoes (banco, data) WHERE excluido = 0")
+
+
+def _migracao_moedas(cur):
+    # Moeda de cada lançamento (os já existentes ficam na moeda padrão)
+    _adicionar_coluna(cur, "transacoes", "moeda", f"TEXT NOT NULL DEFAULT '{MOEDA_PADRAO}'")
+
+    # Moeda de cada banco (bancos sem registro usam a moeda padrão)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS moedas_banco (
+        banco TEXT PRIMARY KEY,
+        moeda TEXT NOT NULL
+    )
+    """)
+
+    # Cotações: quanto vale 1 unidade de `moeda` na moeda padrão, a partir de `data`
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS fx_rates (
+        moeda TEXT NOT NULL,
+        data TEXT NOT NULL,
+        cotacao REAL NOT NULL,
+        PRIMARY KEY (moeda, data)
+    ) WITHOUT ROWID
+    """)
+
+    # o resumo mensal passa a separar os totais por moeda (recriado e reconstruído em seguida)
+    cur.execute("DROP TABLE IF EXISTS resumo_mensal")
+    cur.execute(f"""
+    CREATE TABLE resumo_mensal (
+        mes TEXT NOT NULL,
+        tipo TEXT NOT NULL,
+        categoria TEXT NOT NULL,
+        subcategoria TEXT NOT NULL DEFAULT '',
+        banco TEXT NOT NULL DEFAULT '',
+        moeda TEXT NOT NULL DEFAULT '{MOEDA_PADRAO}',
+        total REAL NOT NULL DEFAULT 0,
+        qtd INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (mes, tipo, categoria, subcategoria, banco, moeda)
+    )
+    """)
+
+
+MIGRACOES = [
+    _migracao_resumo_mensal,
+    _migracao_jobs,
+    _migracao_exclusao_logica,
+    _migracao_impressao,
+    _migracao_regras,
+    _migracao_conciliacao,
+    _migracao_moedas,
+    _migracao_impressao_tipo,
+]
+
+
+def _adicionar_coluna(cur, tabela, coluna, definicao):
+    colunas = [row[1] for row in cur.execute(f"PRAGMA table_info({tabela})")]
+    if coluna not in colunas:
+        cur.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {definicao}")
+
+
+def migrar_db(conn):
+    cur = conn.cursor()
+    versao = cur.execute("PRAGMA user_version").fetchone()[0]
+    if versao >= len(MIGRACOES):
+        return
+    for i, migracao in enumerate(MIGRACOES[versao:], start=versao + 1):
+        migracao(cur)
+        cur.execute(f"PRAGMA user_version = {i}")
+        conn.commit()
+
+    # triggers e resumo dependem do esquema atual: recriados a cada mudança de versão
+    _criar_triggers_resumo(cur)
+    _reconstruir_resumo(cur)
+    conn.commit()
+
+
+# -------- RESUMO MENSAL -------- #
+
+_CHAVE_RESUMO = """strftime('%Y-%m', {r}.data), {r}.tipo, {r}.categoria,
+        COALESCE({r}.subcategoria, ''), COALESCE({r}.banco, ''), {r}.moeda"""
+
+_WHERE_RESUMO = """mes = strftime('%Y-%m', OLD.data) AND tipo = OLD.tipo AND categoria = OLD.categoria
+        AND subcategoria = COALESCE(OLD.subcategoria, '') AND banco = COALESCE(OLD.banco, '')
+        AND moeda = OLD.moeda"""
+
+
+def _criar_triggers_resumo(cur):
+    # apenas linhas ativas (excluido = 0) entram no resumo
+    soma = f"""
+        INSERT INTO resumo_mensal (mes, tipo, categoria, subcategoria, banco, moeda, total, qtd)
+        VALUES ({_CHAVE_RESUMO.format(r="NEW")}, NEW.valor, 1)
+        ON CONFLICT (mes, tipo, categoria, subcategoria, banco, moeda)
+        DO UPDATE SET total = total + excluded.total, qtd = qtd + 1;"""
+    subtrai = f"""
+        UPDATE resumo_mensal SET total = total - OLD.valor, qtd = qtd - 1
+        WHERE {_WHERE_RESUMO};
+        DELETE FROM resumo_mensal WHERE qtd <= 0 AND {_WHERE_RESUMO};"""
+
+    cur.executescript(f"""
+    DROP TRIGGER IF EXISTS trg_resumo_insert;
+    DROP TRIGGER IF EXISTS trg_resumo_delete;
+    DROP TRIGGER IF EXISTS trg_resumo_update;
+    DROP TRIGGER IF EXISTS trg_resumo_update_old;
+    DROP TRIGGER IF EXISTS trg_resumo_update_new;
+    CREATE TRIGGER trg_resumo_insert AFTER INSERT ON transacoes
+    WHEN NEW.excluido = 0
+    BEGIN {soma}
+    END;
+    CREATE TRIGGER trg_resumo_delete AFTER DELETE ON transacoes
+    WHEN OLD.excluido = 0
+    BEGIN {subtrai}
+    END;
+    CREATE TRIGGER trg_resumo_update_old
+    AFTER UPDATE OF tipo, data, valor, categoria, subcategoria, banco, moeda, excluido ON transacoes
+    WHEN OLD.excluido = 0
+    BEGIN {subtrai}
+    END;
+    CREATE TRIGGER trg_resumo_update_new
+    AFTER UPDATE OF tipo, data, valor, categoria, subcategoria, banco, moeda, excluido ON transacoes
+    WHEN NEW.excluido = 0
+    BEGIN {soma}
+    END;
+    """)
+
+
+def _reconstruir_resumo(cur):
+    cur.execute("DELETE FROM resumo_mensal")
+    cur.execute(f"""
+        INSERT INTO resumo_mensal (mes, tipo, categoria, subcategoria, banco, moeda, total, qtd)
+        SELECT {_CHAVE_RESUMO.format(r="t")}, SUM(t.valor), COUNT(*)
+        FROM transacoes t
+        WHERE t.excluido = 0
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """)
+
+
+def rebuild_resumo_mensal():
+    conn = get_connection()
+    cur = conn.cursor()
+    _reconstruir_resumo(cur)
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+
+
+def load_resumo_mensal(filters=None):
+    conn = get_connection()
+    q = "SELECT mes, tipo, categoria, subcategoria, banco, moeda, total, qtd FROM resumo_mensal"
+    params, clauses = [], []
+    if filters:
+        if filters.get("start"):
+            clauses.append("mes >= substr(?, 1, 7)")
+            params.append(filters["start"])
+        if filters.get("end"):
+            clauses.append("mes <= substr(?, 1, 7)")
+            params.append(filters["end"])
+    if clauses:
+        q += " WHERE " + " AND ".join(clauses)
+    q += " ORDER BY mes"
+    df = pd.read_sql_query(q, conn, params=params)
     conn.close()
+    return df
+
+
+def load_anos():
+    # anos com lançamentos, direto do resumo mensal
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT CAST(substr(mes, 1, 4) AS INTEGER) FROM resumo_mensal ORDER BY 1")
+    anos = [row[0] for row in cur.fetchall()]
+    conn.close()
+    return anos
 
 
 # -------- FUNÇÕES AUXILIARES -------- #
@@ -70,6 +376,7 @@ def save_alvo(values):
         cur.execute("INSERT INTO alvo_orcamento (categoria, percentual) VALUES (?, ?)", (cat, perc))
     conn.commit()
     conn.close()
+    invalidar_cache()
 
 # Categorias
 def load_categorias(defaults):
@@ -95,33 +402,167 @@ def save_categorias(categorias):
             cur.execute("INSERT INTO categorias (tipo, categoria) VALUES (?, ?)", (tipo, cat))
     conn.commit()
     conn.close()
+    invalidar_cache()
 
-# Transações
-def insert_transacao(tx):
+# Regras de classificação
+COLUNAS_REGRAS = ["padrao", "tipo", "categoria", "subcategoria", "banco"]
+
+def load_regras():
+    conn = get_connection()
+    df = pd.read_sql_query(f"SELECT {', '.join(COLUNAS_REGRAS)} FROM regras_categoria ORDER BY id", conn)
+    conn.close()
+    return df
+
+def save_regras(regras):
+    # regras: lista de dicts com as chaves de COLUNAS_REGRAS (substitui todas)
     conn = get_connection()
     cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO transacoes (tipo, data, valor, categoria, subcategoria, banco, id_transferencia, descricao)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+    cur.execute("DELETE FROM regras_categoria")
+    cur.executemany(
+        f"INSERT INTO regras_categoria ({', '.join(COLUNAS_REGRAS)}) VALUES (?, ?, ?, ?, ?)",
+        [tuple(regra.get(c) or None for c in COLUNAS_REGRAS) for regra in regras]
+    )
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+
+def load_historico_classificacao(limite=50_000):
+    """Frequência de (descrição, tipo, categoria, subcategoria) entre os lançamentos mais recentes já classificados."""
+    conn = get_connection()
+    df = pd.read_sql_query("""
+        SELECT descricao, tipo, categoria, subcategoria, COUNT(*) AS qtd
+        FROM (
+            SELECT descricao, tipo, categoria, subcategoria FROM transacoes
+            WHERE excluido = 0 AND descricao IS NOT NULL AND descricao != ''
+              AND tipo != 'Transferência' AND categoria != ?
+            ORDER BY id DESC LIMIT ?
+        )
+        GROUP BY descricao, tipo, categoria, subcategoria
+    """, conn, params=[CATEGORIA_A_CLASSIFICAR, limite])
+    conn.close()
+    return df
+
+def load_a_classificar(limite=None):
+    conn = get_connection()
+    q = "SELECT id, tipo, valor, banco, descricao FROM transacoes WHERE excluido = 0 AND categoria = ? ORDER BY id"
+    if limite:
+        q += f" LIMIT {int(limite)}"
+    df = pd.read_sql_query(q, conn, params=[CATEGORIA_A_CLASSIFICAR])
+    conn.close()
+    return df
+
+def _classificar_transacoes(cur, classificacoes):
+    # classificacoes: lista de (tipo, categoria, subcategoria, id)
+    cur.executemany(
+        "UPDATE transacoes SET tipo = ?, categoria = ?, subcategoria = ? WHERE id = ?",
+        classificacoes
+    )
+
+# Transações
+def _chave_transacao(tx):
+    return "|".join([
+        tx["tipo"],
+        str(tx["data"])[:10],
+        f"{float(tx['valor']):.2f}",
+        tx.get("banco") or "",
+        " ".join((tx.get("descricao") or "").lower().split()),
+    ])
+
+
+def _hash_chave(chave, ocorrencia=0):
+    return hashlib.sha1(f"{chave}|{ocorrencia}".encode("utf-8")).hexdigest()
+
+
+def impressao_transacao(tx):
+    """
+    Impressão digital do lançamento: hash de tipo, data, valor, banco e descrição, mais a ocorrência
+    (`tx["ocorrencia"]`, posição entre linhas idênticas do mesmo extrato; 0 para lançamentos manuais).
+    """
+    return _hash_chave(_chave_transacao(tx), tx.get("ocorrencia", 0))
+
+
+def _insert_transacoes(cur, txs, forcar=False):
+    # duplicatas (mesma impressão de uma linha ativa) são ignoradas pelo índice único;
+    # com `forcar`, cada lançamento recebe a próxima ocorrência livre e sempre entra
+    # sem moeda explícita, o lançamento fica na moeda do banco
+    impressoes = [
+        _impressao_livre(cur, None, _chave_transacao(tx)) if forcar else impressao_transacao(tx)
+        for tx in txs
+    ]
+    cur.executemany(f"""
+        INSERT INTO transacoes (tipo, data, valor, categoria, subcategoria, banco, id_transferencia, descricao, impressao, moeda)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?,
+                COALESCE(?, (SELECT moeda FROM moedas_banco WHERE banco = ?), '{MOEDA_PADRAO}'))
+        ON CONFLICT DO NOTHING
+    """, [(
         tx["tipo"], tx["data"], tx["valor"], tx["categoria"],
         tx.get("subcategoria"), tx.get("banco"),
-        tx.get("id_transferencia"), tx.get("descricao")
-    ))
-    conn.commit()
+        tx.get("id_transferencia"), tx.get("descricao"),
+        impressao,
+        tx.get("moeda"), tx.get("banco")
+    ) for tx, impressao in zip(txs, impressoes)])
+    return max(cur.rowcount, 0)
+
+
+def insert_transacao(tx, forcar=False):
+    # False se o lançamento já existia; `forcar` registra mesmo idêntico a um existente
+    inseridos, _ = insert_transacoes([tx], forcar)
+    return inseridos == 1
+
+
+def insert_transferencia(tx_out, tx_in, forcar=False):
+    # as duas pernas entram juntas ou nenhuma entra (False se já existiam)
+    conn = get_connection()
+    cur = conn.cursor()
+    inseridos = _insert_transacoes(cur, [tx_out, tx_in], forcar)
+    if inseridos == 2:
+        conn.commit()
+    else:
+        conn.rollback()
     conn.close()
+    invalidar_cache()
+    return inseridos == 2
 
 
-def load_transacoes(filters=None):
+def insert_transacoes(txs, forcar=False):
+    # vários lançamentos em uma única transação; retorna (inseridos, ignorados)
     conn = get_connection()
-    q = "SELECT * FROM transacoes"
-    params, clauses = [], []
+    cur = conn.cursor()
+    inseridos = _insert_transacoes(cur, txs, forcar)
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+    return inseridos, len(txs) - inseridos
+
+
+# colunas de negócio (sem as colunas internas de controle)
+COLUNAS_TRANSACOES = ["id", "tipo", "data", "valor", "moeda", "categoria", "subcategoria", "banco", "id_transferencia", "descricao"]
+
+# tipos compactos: texto de baixa cardinalidade vira category, data vira datetime64
+TIPOS_TRANSACOES = {
+    "id": "int64",
+    "valor": "float64",
+    "moeda": "category",
+    "tipo": "category",
+    "categoria": "category",
+    "subcategoria": "category",
+    "banco": "category",
+    "id_transferencia": "category",
+}
+
+# descrições repetidas (extratos importados) também viram category abaixo desta proporção de únicos
+LIMITE_CATEGORIA_DESCRICAO = 0.5
+
+
+def _filtro_transacoes(filters=None):
+    # sempre restrito às linhas ativas (usa o índice parcial idx_transacoes_ativas)
+    params, clauses = [], ["excluido = 0"]
     if filters:
         if filters.get("start"):
-            clauses.append("date(data) >= date(?)")
+            clauses.append("data >= date(?)")
             params.append(filters["start"])
         if filters.get("end"):
-            clauses.append("date(data) <= date(?)")
+            clauses.append("data <= date(?)")
             params.append(filters["end"])
         if filters.get("tipo") and filters["tipo"] != "Todos":
             clauses.append("tipo = ?")
@@ -129,17 +570,649 @@ def load_transacoes(filters=None):
         if filters.get("banco") and filters["banco"] != "Todos":
             clauses.append("banco = ?")
             params.append(filters["banco"])
-    if clauses:
-        q += " WHERE " + " AND ".join(clauses)
+        if filters.get("moeda"):
+            moedas = filters["moeda"]
+            clauses.append("moeda IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([moedas] if isinstance(moedas, str) else list(moedas)))
+    return clauses, params
+
+
+def load_transacoes(filters=None, columns=None):
+    """
+    Carrega as transações ativas. `columns` restringe as colunas lidas do banco
+    (padrão: todas as de COLUNAS_TRANSACOES), já com tipos compactos.
+    """
+    columns = list(columns or COLUNAS_TRANSACOES)
+    invalidas = set(columns) - set(COLUNAS_TRANSACOES)
+    if invalidas:
+        raise ValueError(f"Colunas inválidas: {', '.join(sorted(invalidas))}")
+
+    conn = get_connection()
+    clauses, params = _filtro_transacoes(filters)
+    q = f"SELECT {', '.join(columns)} FROM transacoes"
+    q += " WHERE " + " AND ".join(clauses)
     q += " ORDER BY data DESC, id DESC"
-    df = pd.read_sql_query(q, conn, params=params)
+    df = pd.read_sql_query(
+        q, conn, params=params,
+        dtype={c: t for c, t in TIPOS_TRANSACOES.items() if c in columns}
+    )
+    conn.close()
+
+    if "data" in df.columns:
+        df["data"] = pd.to_datetime(df["data"], format="ISO8601")
+    if "descricao" in df.columns and len(df) and df["descricao"].nunique() < len(df) * LIMITE_CATEGORIA_DESCRICAO:
+        df["descricao"] = df["descricao"].astype("category")
+    return df
+
+
+def load_saldo_diario(filters=None, base=MOEDA_PADRAO):
+    """
+    Saldo acumulado ao fim de cada dia com movimento, por banco e total ("Total"), em `base`.
+    O acumulado de cada conta é calculado no SQLite, na moeda da própria conta, e só o
+    saldo resultante é convertido pela cotação de cada dia (o saldo de hoje vale pela
+    cotação de hoje, não pelas cotações das datas de cada movimento). A série vai até o
+    fim do período (ou hoje), para o último ponto coincidir com o saldo convertido na tabela.
+    """
+    conn = get_connection()
+    filters = filters or {}
+    clauses, params = _filtro_transacoes({"end": filters.get("end")})
+    where = " AND ".join(clauses + ["banco IS NOT NULL"])
+    nativo = pd.read_sql_query(f"""
+        WITH diario AS (
+            SELECT banco, moeda, data, SUM(valor) AS fluxo
+            FROM transacoes
+            WHERE {where}
+            GROUP BY banco, moeda, data
+        )
+        SELECT banco, moeda, data, SUM(fluxo) OVER (PARTITION BY banco, moeda ORDER BY data) AS saldo FROM diario
+    """, conn, params=params, dtype={"saldo": "float64"})
+
+    if nativo.empty:
+        conn.close()
+        return pd.DataFrame({"banco": pd.Categorical([]), "data": pd.to_datetime([]), "saldo": pd.Series(dtype="float64")})
+
+    # saldo de cada conta (banco, moeda) em todos os dias, repetido entre um movimento e outro
+    dias = sorted(set(nativo["data"]) | {min(filters.get("end") or date.today().isoformat(), date.today().isoformat())})
+    largo = nativo.pivot_table(index="data", columns=["banco", "moeda"], values="saldo", aggfunc="sum")
+    largo = largo.reindex(dias).ffill()
+
+    # fator de cada moeda em cada dia: uma busca pela chave primária de fx_rates por par
+    moedas = sorted(set(nativo["moeda"]))
+    fatores = pd.read_sql_query(f"""
+        SELECT m.value AS moeda, d.value AS data, {_sql_fator("m.value", "d.value", base)} AS fator
+        FROM json_each(?) d CROSS JOIN json_each(?) m
+    """, conn, params=[json.dumps(dias), json.dumps(moedas)], dtype={"fator": "float64"})
+    conn.close()
+    fatores = fatores.pivot(index="data", columns="moeda", values="fator").reindex(dias)
+    convertido = largo * fatores[largo.columns.get_level_values("moeda")].to_numpy()
+
+    # contas sem movimento ainda ficam de fora (NaN); moedas sem cotação também
+    por_banco = convertido.T.groupby(level="banco").sum(min_count=1).T
+    por_banco["Total"] = convertido.sum(axis=1, min_count=1)
+    df = (
+        por_banco.rename_axis(index="data", columns="banco")
+        .reset_index()
+        .melt(id_vars="data", var_name="banco", value_name="saldo")
+        .dropna(subset=["saldo"])
+    )
+    df["banco"] = df["banco"].astype("category")
+    df["data"] = pd.to_datetime(df["data"], format="ISO8601")
+    if filters.get("start"):
+        # o saldo já vem acumulado desde o início: basta cortar a janela exibida
+        df = df[df["data"] >= pd.Timestamp(filters["start"])]
+    return df.reset_index(drop=True)
+
+
+def delete_transacoes(ids=None, filters=None):
+    """
+    Exclusão lógica em lote, por lista de ids ou pelos mesmos filtros de `load_transacoes`.
+    A outra perna de uma transferência é sempre excluída junto.
+    Retorna (id do lote, quantidade excluída); o lote pode ser desfeito com `desfazer_exclusao`.
+    """
+    if ids is not None:
+        alvo = "id IN (SELECT value FROM json_each(?))"
+        params = [json.dumps([int(i) for i in ids])]
+    else:
+        clauses, params = _filtro_transacoes(filters)
+        alvo = " AND ".join(clauses)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("INSERT INTO lotes_exclusao (qtd) VALUES (0)")
+    lote = cur.lastrowid
+    cur.execute(f"""
+        UPDATE transacoes SET excluido = 1, lote_exclusao = ?
+        WHERE excluido = 0 AND (
+            id IN (SELECT id FROM transacoes WHERE {alvo})
+            OR id_transferencia IN (
+                SELECT id_transferencia FROM transacoes
+                WHERE id_transferencia IS NOT NULL AND {alvo}
+            )
+        )
+    """, [lote, *params, *params])
+    qtd = cur.rowcount
+    if qtd > 0:
+        cur.execute("UPDATE lotes_exclusao SET qtd = ? WHERE id = ?", (qtd, lote))
+    else:
+        cur.execute("DELETE FROM lotes_exclusao WHERE id = ?", (lote,))
+        lote = None
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+    return lote, qtd
+
+
+def load_ultimo_lote_exclusao():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT id, criado_em, qtd FROM lotes_exclusao
+        WHERE desfeito = 0 AND qtd > 0
+        ORDER BY id DESC LIMIT 1
+    """)
+    row = cur.fetchone()
+    conn.close()
+    if row:
+        return {"id": row[0], "criado_em": row[1], "qtd": row[2]}
+    return None
+
+
+def desfazer_exclusao(lote=None):
+    """
+    Restaura as linhas de um lote (por padrão, o último) em uma única transação.
+    Linhas que hoje duplicariam um lançamento ativo continuam excluídas, e com elas a
+    outra perna da transferência: as duas pernas voltam juntas ou nenhuma volta.
+    Retorna (restaurados, ignorados).
+    """
+    if lote is None:
+        ultimo = load_ultimo_lote_exclusao()
+        if ultimo is None:
+            return 0, 0
+        lote = ultimo["id"]
+
+    conn = get_connection()
+    cur = conn.cursor()
+    # linhas que colidiriam com um lançamento ativo, estendidas às transferências inteiras
+    cur.execute("""
+        SELECT t.id FROM transacoes t
+        WHERE t.lote_exclusao = ? AND t.excluido = 1 AND t.id_transferencia IN (
+            SELECT b.id_transferencia FROM transacoes b
+            WHERE b.lote_exclusao = t.lote_exclusao AND b.excluido = 1
+              AND EXISTS (SELECT 1 FROM transacoes a WHERE a.excluido = 0 AND a.impressao = b.impressao)
+        )
+        UNION
+        SELECT t.id FROM transacoes t
+        WHERE t.lote_exclusao = ? AND t.excluido = 1
+          AND EXISTS (SELECT 1 FROM transacoes a WHERE a.excluido = 0 AND a.impressao = t.impressao)
+    """, (lote, lote))
+    bloqueadas = [row[0] for row in cur.fetchall()]
+    cur.execute("""
+        UPDATE transacoes SET excluido = 0, lote_exclusao = NULL
+        WHERE lote_exclusao = ? AND excluido = 1 AND id NOT IN (SELECT value FROM json_each(?))
+    """, (lote, json.dumps(bloqueadas)))
+    qtd = cur.rowcount
+    cur.execute("UPDATE lotes_exclusao SET desfeito = 1 WHERE id = ?", (lote,))
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+    return qtd, len(bloqueadas)
+
+
+# Arquivo dos lançamentos excluídos (um banco SQLite por ledger)
+PASTA_ARQUIVO = "data/arquivo"
+
+
+def arquivar_excluidos():
+    """
+    Move os lançamentos excluídos para data/arquivo/<ledger>.db, deixando a tabela principal
+    só com as linhas que a página ainda usa. O último lote continua no ledger, para que o
+    "Desfazer exclusão" siga funcionando. Pode ser repetido com segurança: as linhas são
+    copiadas por id (sem duplicar) antes de sair do ledger. Retorna a quantidade arquivada.
+    """
+    os.makedirs(PASTA_ARQUIVO, exist_ok=True)
+    arquivo = os.path.join(PASTA_ARQUIVO, f"{ledger_atual()}.db")
+    ultimo = load_ultimo_lote_exclusao()
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("ATTACH DATABASE ? AS arquivo", (arquivo,))
+    try:
+        colunas = [row[1] for row in cur.execute("PRAGMA main.table_info(transacoes)")]
+        cur.execute("CREATE TABLE IF NOT EXISTS arquivo.transacoes (id INTEGER PRIMARY KEY)")
+        # colunas criadas por migrações posteriores ao primeiro arquivamento
+        existentes = {row[1] for row in cur.execute("PRAGMA arquivo.table_info(transacoes)")}
+        for coluna in colunas:
+            if coluna not in existentes:
+                cur.execute(f"ALTER TABLE arquivo.transacoes ADD COLUMN {coluna}")
+
+        alvo = "excluido = 1 AND (lote_exclusao IS NULL OR lote_exclusao != ?)"
+        lista = ", ".join(colunas)
+        cur.execute(f"""
+            INSERT OR IGNORE INTO arquivo.transacoes ({lista})
+            SELECT {lista} FROM main.transacoes WHERE {alvo}
+        """, (ultimo["id"] if ultimo else -1,))
+        cur.execute(f"DELETE FROM main.transacoes WHERE {alvo}", (ultimo["id"] if ultimo else -1,))
+        qtd = cur.rowcount
+        # lotes que não têm mais linhas no ledger não podem ser desfeitos
+        cur.execute("""
+            DELETE FROM main.lotes_exclusao
+            WHERE id NOT IN (SELECT lote_exclusao FROM main.transacoes WHERE lote_exclusao IS NOT NULL)
+        """)
+        conn.commit()
+    finally:
+        cur.execute("DETACH DATABASE arquivo")
+        conn.close()
+    invalidar_cache()
+    return qtd
+
+
+# Edição na tabela de lançamentos
+COLUNAS_EDITAVEIS = ["data", "valor", "categoria", "subcategoria", "banco", "descricao"]
+
+# colunas que entram na impressão digital / que invalidam a conciliação com o extrato
+_COLUNAS_IMPRESSAO = {"data", "valor", "banco", "descricao"}
+_COLUNAS_CONCILIACAO = {"data", "valor", "banco"}
+
+# nas transferências, estes campos valem para as duas pernas
+_COLUNAS_TRANSFERENCIA = {"data", "valor", "descricao"}
+
+
+def _normalizar_edicao(coluna, valor):
+    if coluna not in COLUNAS_EDITAVEIS:
+        raise ValueError(f"Coluna não editável: {coluna}")
+    if coluna == "data":
+        data = pd.to_datetime(valor, errors="coerce")
+        if pd.isna(data):
+            raise ValueError(f"Data inválida: {valor!r}")
+        return data.date().isoformat()
+    if coluna == "valor":
+        if valor is None or pd.isna(valor):
+            raise ValueError("Valor não pode ficar vazio.")
+        return round(float(valor), 2)
+    if coluna == "descricao":
+        return valor or ""
+    if coluna == "categoria" and not valor:
+        raise ValueError("Categoria não pode ficar vazia.")
+    return valor or None
+
+
+def _validar_classificacao(tx, cadastradas):
+    # categoria e subcategoria precisam combinar com o tipo do lançamento
+    tipo, categoria, subcategoria = tx["tipo"], tx["categoria"], tx["subcategoria"]
+    if categoria == CATEGORIA_A_CLASSIFICAR:
+        validas = [categoria]
+    elif tipo == "Despesa":
+        validas = GRUPOS_DESPESA
+    elif tipo == "Investimento":
+        validas = ["Investimento"]
+    elif cadastradas.get("Receita"):
+        validas = cadastradas["Receita"]
+    else:
+        # sem categorias de receita cadastradas, só ficam de fora as que pertencem a outro tipo
+        outras = GRUPOS_DESPESA + ["Investimento", "Transferência"]
+        validas = [] if categoria in outras else [categoria]
+    if categoria not in validas:
+        raise ValueError(f"A categoria {categoria!r} não vale para lançamentos do tipo {tipo}.")
+    if subcategoria:
+        if tipo == "Receita" or categoria == CATEGORIA_A_CLASSIFICAR:
+            raise ValueError(f"Lançamentos em {categoria!r} não têm subcategoria.")
+        if cadastradas.get(categoria) and subcategoria not in cadastradas[categoria]:
+            raise ValueError(f"A subcategoria {subcategoria!r} não pertence à categoria {categoria!r}.")
+
+
+def _impressao_livre(cur, id_, chave):
+    # primeira ocorrência cuja impressão não pertence a outro lançamento ativo
+    ocorrencia = 0
+    while True:
+        impressao = _hash_chave(chave, ocorrencia)
+        dono = cur.execute(
+            "SELECT id FROM transacoes WHERE excluido = 0 AND impressao = ?", (impressao,)
+        ).fetchone()
+        if dono is None or dono[0] == id_:
+            return impressao
+        ocorrencia += 1
+
+
+def _update_transacoes(cur, alteracoes):
+    # alteracoes: {id: {coluna: novo valor}}; retorna a quantidade de lançamentos alterados
+    colunas = "id, tipo, data, valor, moeda, categoria, subcategoria, banco, id_transferencia, descricao"
+    atuais = {row["id"]: dict(row) for row in cur.execute(f"""
+        SELECT {colunas} FROM transacoes
+        WHERE excluido = 0 AND id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(alteracoes)),))}
+
+    # outras pernas das transferências editadas
+    transferencias = {tx["id_transferencia"] for tx in atuais.values() if tx["id_transferencia"]}
+    pernas = {}
+    for row in cur.execute(f"""
+        SELECT {colunas} FROM transacoes
+        WHERE excluido = 0 AND id_transferencia IN (SELECT value FROM json_each(?))
+    """, (json.dumps(sorted(transferencias)),)):
+        atuais.setdefault(row["id"], dict(row))
+        pernas.setdefault(row["id_transferencia"], []).append(row["id"])
+
+    novos = {}
+    for id_, campos in alteracoes.items():
+        atual = atuais.get(id_)
+        if atual is None:
+            continue  # excluído por outra sessão
+        for coluna, valor in campos.items():
+            valor = _normalizar_edicao(coluna, valor)
+            if atual["tipo"] == "Transferência":
+                if coluna in ("categoria", "subcategoria"):
+                    continue
+                if coluna == "valor":
+                    valor = abs(valor) if atual["valor"] > 0 else -abs(valor)
+                if coluna in _COLUNAS_TRANSFERENCIA:
+                    for outro in pernas.get(atual["id_transferencia"], []):
+                        # entre moedas diferentes cada perna guarda o próprio valor
+                        if outro != id_ and not (coluna == "valor" and atuais[outro]["moeda"] != atual["moeda"]):
+                            novos.setdefault(outro, {})[coluna] = -valor if coluna == "valor" else valor
+            elif coluna == "valor":
+                valor = abs(valor) if atual["tipo"] == "Receita" else -abs(valor)
+            novos.setdefault(id_, {})[coluna] = valor
+
+    # só o que de fato mudou
+    novos = {
+        id_: {c: v for c, v in campos.items() if v != atuais[id_][c]}
+        for id_, campos in novos.items()
+    }
+    novos = {id_: campos for id_, campos in novos.items() if campos}
+
+    # a classificação final de cada linha tocada precisa combinar com o tipo
+    cadastradas = {}
+    for tipo, categoria in cur.execute("SELECT tipo, categoria FROM categorias"):
+        cadastradas.setdefault(tipo, []).append(categoria)
+    for id_, campos in novos.items():
+        if campos.keys() & {"categoria", "subcategoria"}:
+            _validar_classificacao({**atuais[id_], **campos}, cadastradas)
+
+    for ids in pernas.values():
+        bancos = {novos.get(i, {}).get("banco", atuais[i]["banco"]) for i in ids}
+        if len(ids) == 2 and len(bancos) == 1:
+            raise ValueError("Banco de origem e destino da transferência não podem ser iguais.")
+
+    # o lançamento passa para a moeda do novo banco, com o valor convertido pela cotação da
+    # data (assim as duas pernas de uma transferência continuam valendo o mesmo)
+    moedas_banco = dict(cur.execute("SELECT banco, moeda FROM moedas_banco"))
+    for id_, campos in novos.items():
+        if "banco" in campos:
+            moeda = moedas_banco.get(campos["banco"], MOEDA_PADRAO)
+            tx = {**atuais[id_], **campos}
+            if moeda != tx["moeda"]:
+                convertido = cur.execute(f"""
+                    SELECT ROUND(v.valor * {_sql_fator("v.moeda", "v.data", moeda)}, 2)
+                    FROM (SELECT ? AS valor, ? AS moeda, ? AS data) v
+                """, (tx["valor"], tx["moeda"], tx["data"])).fetchone()[0]
+                if convertido is None:
+                    raise ValueError(
+                        f"Sem cotação para converter o lançamento de {tx['moeda']} para {moeda} "
+                        f"(banco {campos['banco']}). Importe as cotações em Configuração → Moedas e Câmbio."
+                    )
+                campos["moeda"] = moeda
+                campos["valor"] = convertido
+
+    for id_, campos in novos.items():
+        if campos.keys() & _COLUNAS_IMPRESSAO:
+            campos["impressao"] = _impressao_livre(cur, id_, _chave_transacao({**atuais[id_], **campos}))
+        if campos.keys() & _COLUNAS_CONCILIACAO:
+            campos["conciliado_em"] = None
+
+    # um UPDATE em lote para cada conjunto de colunas alteradas
+    lotes = {}
+    for id_, campos in novos.items():
+        ordem = tuple(sorted(campos))
+        lotes.setdefault(ordem, []).append((*[campos[c] for c in ordem], id_))
+    for ordem, params in lotes.items():
+        cur.executemany(
+            f"UPDATE transacoes SET {', '.join(f'{c} = ?' for c in ordem)} WHERE id = ? AND excluido = 0",
+            params
+        )
+    return len(novos)
+
+
+def update_transacoes(alteracoes):
+    """
+    Grava edições feitas na tabela de lançamentos: {id: {coluna: novo valor}}, apenas com as
+    células alteradas. Tudo em uma transação, com um UPDATE em lote por conjunto de colunas.
+
+    O sinal do valor segue o tipo (receita positiva, despesa/investimento negativo) e a
+    categoria precisa valer para o tipo; em transferências, data, valor e descrição são
+    replicados na outra perna e a categoria não muda. Ao trocar o banco por um de outra
+    moeda, o valor é convertido pela cotação da data do lançamento.
+    Resumo mensal (triggers), impressão digital e conciliação são ajustados só nas linhas tocadas.
+    Retorna a quantidade de lançamentos alterados.
+    """
+    alteracoes = {int(id_): campos for id_, campos in alteracoes.items() if campos}
+    if not alteracoes:
+        return 0
+
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    try:
+        qtd = _update_transacoes(conn.cursor(), alteracoes)
+        conn.commit()
+    except ValueError:
+        conn.rollback()
+        raise
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise ValueError("A edição deixaria dois lançamentos com a mesma impressão digital; tente novamente.")
+    finally:
+        conn.close()
+    invalidar_cache()
+    return qtd
+
+
+# Moedas e câmbio
+_CODIGO_MOEDA = re.compile(r"^[A-Z]{3,5}$")
+
+def validar_moeda(codigo):
+    codigo = str(codigo or "").strip().upper()
+    if not _CODIGO_MOEDA.match(codigo):
+        raise ValueError(f"Código de moeda inválido: {codigo!r} (use o código ISO, ex.: USD)")
+    return codigo
+
+
+def _sql_cotacao(moeda, data):
+    """
+    Expressão SQL da cotação de `moeda` vigente em `data` (a última publicada até a data;
+    antes da primeira, a primeira). Cada busca usa a chave primária (moeda, data) de fx_rates.
+    As colunas devem vir qualificadas pela tabela (ex.: "t.moeda"): sem isso, dentro da
+    subconsulta elas se referem às colunas de fx_rates.
+    """
+    return f"""(CASE WHEN {moeda} = '{MOEDA_PADRAO}' THEN 1.0 ELSE COALESCE(
+        (SELECT f.cotacao FROM fx_rates f WHERE f.moeda = {moeda} AND f.data <= {data} ORDER BY f.data DESC LIMIT 1),
+        (SELECT f.cotacao FROM fx_rates f WHERE f.moeda = {moeda} ORDER BY f.data LIMIT 1)) END)"""
+
+
+def _sql_fator(moeda, data, base):
+    # fator que leva um valor em `moeda` para `base` na `data` (NULL sem cotação)
+    base = validar_moeda(base)
+    if base == MOEDA_PADRAO:
+        return _sql_cotacao(moeda, data)
+    literal = f"'{base}'"
+    return f"({_sql_cotacao(moeda, data)} / {_sql_cotacao(literal, data)})"
+
+
+def load_moedas_banco():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT banco, moeda FROM moedas_banco")
+    moedas = dict(cur.fetchall())
+    conn.close()
+    return moedas
+
+
+def save_moedas_banco(moedas):
+    """
+    Define a moeda de cada banco ({banco: moeda}; substitui todas). Os lançamentos já
+    gravados do banco passam para a nova moeda (o resumo mensal acompanha pelos triggers).
+    """
+    moedas = {banco: validar_moeda(moeda) for banco, moeda in moedas.items() if banco}
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM moedas_banco")
+    cur.executemany("INSERT INTO moedas_banco (banco, moeda) VALUES (?, ?)", list(moedas.items()))
+    cur.execute(f"""
+        UPDATE transacoes SET moeda = COALESCE((SELECT m.moeda FROM moedas_banco m WHERE m.banco = transacoes.banco), '{MOEDA_PADRAO}')
+        WHERE banco IS NOT NULL
+          AND moeda != COALESCE((SELECT m.moeda FROM moedas_banco m WHERE m.banco = transacoes.banco), '{MOEDA_PADRAO}')
+    """)
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+
+
+def save_cotacoes(cotacoes):
+    """Grava cotações (DataFrame com moeda, data ISO e cotacao); datas já existentes são atualizadas."""
+    linhas = [
+        (validar_moeda(moeda), str(data)[:10], float(cotacao))
+        for moeda, data, cotacao in zip(cotacoes["moeda"], cotacoes["data"], cotacoes["cotacao"])
+    ]
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.executemany("""
+        INSERT INTO fx_rates (moeda, data, cotacao) VALUES (?, ?, ?)
+        ON CONFLICT (moeda, data) DO UPDATE SET cotacao = excluded.cotacao
+    """, linhas)
+    conn.commit()
     conn.close()
+    invalidar_cache()
+    return len(linhas)
+
+
+def load_cotacoes():
+    conn = get_connection()
+    df = pd.read_sql_query(
+        "SELECT moeda, data, cotacao FROM fx_rates ORDER BY data",
+        conn, dtype={"cotacao": "float64"}
+    )
+    conn.close()
+    df["data"] = pd.to_datetime(df["data"], format="ISO8601")
     return df
 
 
-def delete_transacoes(ids):
+def load_resumo_cotacoes():
+    # cobertura das cotações por moeda, e moedas em uso ainda sem nenhuma cotação
+    conn = get_connection()
+    df = pd.read_sql_query(f"""
+        SELECT moeda, MIN(data) AS desde, MAX(data) AS ate, COUNT(*) AS cotacoes FROM fx_rates GROUP BY moeda
+        UNION ALL
+        SELECT DISTINCT moeda, NULL, NULL, 0 FROM transacoes
+        WHERE excluido = 0 AND moeda != '{MOEDA_PADRAO}'
+          AND moeda NOT IN (SELECT moeda FROM fx_rates)
+        ORDER BY moeda
+    """, conn)
+    conn.close()
+    return df
+
+
+# Conciliação
+def load_conciliacao(banco, inicio, fim):
+    """Lançamentos ativos de um banco entre `inicio` e `fim` (inclusive), para conferência com o extrato."""
+    conn = get_connection()
+    df = pd.read_sql_query("""
+        SELECT id, data, valor, descricao, conciliado_em FROM transacoes
+        WHERE excluido = 0 AND banco = ? AND data BETWEEN date(?) AND date(?)
+        ORDER BY data, id
+    """, conn, params=[banco, inicio, fim], dtype={"id": "int64", "valor": "float64"})
+    conn.close()
+    return df
+
+
+def load_saldo_banco(banco, antes_de=None):
+    # saldo do banco considerando apenas lançamentos anteriores a `antes_de` (todos, se None)
+    conn = get_connection()
+    q = "SELECT COALESCE(SUM(valor), 0) FROM transacoes WHERE excluido = 0 AND banco = ?"
+    params = [banco]
+    if antes_de:
+        q += " AND data < date(?)"
+        params.append(antes_de)
+    saldo = conn.execute(q, params).fetchone()[0]
+    conn.close()
+    return float(saldo)
+
+
+def conciliar_transacoes(ids):
+    """Marca os lançamentos como conferidos com o extrato (um único UPDATE); retorna quantos mudaram."""
     conn = get_connection()
     cur = conn.cursor()
-    cur.executemany("DELETE FROM transacoes WHERE id = ?", [(i,) for i in ids])
+    cur.execute("""
+        UPDATE transacoes SET conciliado_em = CURRENT_TIMESTAMP
+        WHERE excluido = 0 AND conciliado_em IS NULL
+          AND id IN (SELECT value FROM json_each(?))
+    """, (json.dumps([int(i) for i in ids]),))
+    qtd = cur.rowcount
     conn.commit()
     conn.close()
+    invalidar_cache()
+    return qtd
+
+
+# Jobs
+def criar_job(tipo, parametros=None):
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO jobs (tipo, parametros) VALUES (?, ?)",
+        (tipo, json.dumps(parametros or {}))
+    )
+    job_id = cur.lastrowid
+    conn.commit()
+    conn.close()
+    return job_id
+
+
+def _atualizar_job(cur, job_id, **campos):
+    if "checkpoint" in campos:
+        campos["checkpoint"] = json.dumps(campos["checkpoint"])
+    sets = ", ".join(f"{campo} = ?" for campo in campos)
+    cur.execute(
+        f"UPDATE jobs SET {sets}, atualizado_em = CURRENT_TIMESTAMP WHERE id = ?",
+        (*campos.values(), job_id)
+    )
+
+
+def atualizar_job(job_id, **campos):
+    conn = get_connection()
+    cur = conn.cursor()
+    _atualizar_job(cur, job_id, **campos)
+    conn.commit()
+    conn.close()
+
+
+def load_job(job_id):
+    jobs = load_jobs(ids=[job_id])
+    return jobs[0] if jobs else None
+
+
+def load_jobs(status=None, ids=None, tipos=None, limite=None):
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    q = "SELECT * FROM jobs"
+    params, clauses = [], []
+    if status:
+        clauses.append(f"status IN ({', '.join('?' for _ in status)})")
+        params.extend(status)
+    if ids:
+        clauses.append(f"id IN ({', '.join('?' for _ in ids)})")
+        params.extend(ids)
+    if tipos:
+        clauses.append(f"tipo IN ({', '.join('?' for _ in tipos)})")
+        params.extend(tipos)
+    if clauses:
+        q += " WHERE " + " AND ".join(clauses)
+    q += " ORDER BY id DESC"
+    if limite:
+        q += f" LIMIT {int(limite)}"
+    rows = conn.execute(q, params).fetchall()
+    conn.close()
+
+    jobs = []
+    for row in rows:
+        job = dict(row)
+        job["parametros"] = json.loads(job["parametros"] or "{}")
+        job["checkpoint"] = json.loads(job["checkpoint"]) if job["checkpoint"] else None
+        jobs.append(job)
+    return jobs
@@ -0,0 +1,135 @@
+import pandas as pd
+
+from db import _chave_transacao, CATEGORIA_A_CLASSIFICAR
+
+# Nomes de coluna aceitos nos extratos (minúsculas) -> nome interno
+COLUNAS_EXTRATO = {
+    "data": "data",
+    "date": "data",
+    "valor": "valor",
+    "amount": "valor",
+    "descricao": "descricao",
+    "descrição": "descricao",
+    "historico": "descricao",
+    "histórico": "descricao",
+    "description": "descricao",
+    "tipo": "tipo",
+    "categoria": "categoria",
+    "subcategoria": "subcategoria",
+    "saldo": "saldo",
+    "balance": "saldo",
+}
+
+TAMANHO_LOTE = 5000
+
+
+def _normalizar_valor(col):
+    """
+    Aceita números ou textos no formato brasileiro ("R$ 1.234,56") ou americano ("1,234.56").
+    O separador decimal é o último entre "," e "." no texto; o outro é o de milhar. Um único
+    separador repetido ("1.234.567") só pode ser de milhar.
+
+    >>> _normalizar_valor(pd.Series(["R$ 1.234,56", "1,234.56", "-10,5", "2.5", "1.234.567"])).tolist()
+    [1234.56, 1234.56, -10.5, 2.5, 1234567.0]
+    """
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype("float64")
+    texto = col.astype(str).str.replace("R$", "", regex=False).str.strip()
+    virgula_decimal = texto.str.rfind(",") > texto.str.rfind(".")
+    milhar = texto.where(virgula_decimal, texto.str.replace(",", "", regex=False))
+    milhar = milhar.where(~virgula_decimal, milhar.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    # sobrou mais de um "." (só havia um tipo de separador, repetido): são todos de milhar
+    texto = milhar.where(milhar.str.count(r"\.") <= 1, milhar.str.replace(".", "", regex=False))
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def normalizar_extrato(df):
+    """
+    Padroniza um extrato bancário: colunas renomeadas, `data` como texto ISO e `valor` numérico.
+    Linhas sem data ou valor válidos são descartadas.
+    """
+    df = df.rename(columns=lambda c: COLUNAS_EXTRATO.get(str(c).strip().lower(), str(c).strip().lower()))
+    faltando = {"data", "valor"} - set(df.columns)
+    if faltando:
+        raise ValueError(f"Extrato sem as colunas obrigatórias: {', '.join(sorted(faltando))}")
+
+    df = df.copy()
+    datas = pd.to_datetime(df["data"], dayfirst=True, format="mixed", errors="coerce")
+    df["data"] = datas.dt.strftime("%Y-%m-%d")
+    df["valor"] = _normalizar_valor(df["valor"]).round(2)
+    if "saldo" in df.columns:
+        df["saldo"] = _normalizar_valor(df["saldo"]).round(2)
+    if "descricao" not in df.columns:
+        df["descricao"] = ""
+    df["descricao"] = df["descricao"].fillna("").astype(str).str.strip()
+    return df.dropna(subset=["data", "valor"])
+
+
+def contar_linhas(arquivo):
+    with open(arquivo, "rb") as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+
+def ler_extrato(arquivo, inicio=0, tamanho=TAMANHO_LOTE):
+    """
+    Lê um extrato CSV em lotes, a partir da linha `inicio` (para retomar importações).
+    Gera tuplas (linhas_lidas, DataFrame normalizado); o separador é detectado automaticamente.
+    """
+    lidas = inicio
+    leitor = pd.read_csv(
+        arquivo, sep=None, engine="python", dtype=str,
+        skiprows=range(1, inicio + 1), chunksize=tamanho
+    )
+    for lote in leitor:
+        lidas += len(lote)
+        yield lidas, normalizar_extrato(lote)
+
+
+def extrato_para_transacoes(df, banco, contagem=None, classificador=None):
+    """
+    Converte linhas de extrato normalizadas em dicionários no formato de `insert_transacoes`.
+
+    `contagem` (chave do lançamento -> vezes já vista no arquivo) numera as linhas idênticas
+    do extrato, para que a reimportação do mesmo arquivo (ou de um extrato sobreposto) seja
+    ignorada sem descartar duas compras iguais no mesmo dia. Deve ser compartilhado entre os lotes.
+
+    Com um `classificador`, as linhas sem categoria recebem a classificação sugerida.
+    """
+    contagem = {} if contagem is None else contagem
+    vazio = pd.Series(None, index=df.index, dtype=object)
+    tipo = df["tipo"] if "tipo" in df.columns else vazio
+    categoria = df["categoria"] if "categoria" in df.columns else vazio
+    subcategoria = df["subcategoria"] if "subcategoria" in df.columns else vazio
+
+    if classificador is not None:
+        sem_categoria = categoria.isna() | (categoria == "")
+        if sem_categoria.any():
+            sugestoes = classificador.classificar_series(df.loc[sem_categoria, "descricao"], df.loc[sem_categoria, "valor"])
+            sugerida = sugestoes["categoria"].notna()
+            alvo = sugestoes.index[sugerida]
+            categoria = categoria.astype(object).copy()
+            subcategoria = subcategoria.astype(object).copy()
+            tipo = tipo.astype(object).copy()
+            categoria.loc[alvo] = sugestoes.loc[alvo, "categoria"]
+            subcategoria.loc[alvo] = sugestoes.loc[alvo, "subcategoria"]
+            tipo.loc[alvo] = tipo.loc[alvo].fillna(sugestoes.loc[alvo, "tipo"])
+
+    tipo = tipo.fillna(df["valor"].map(lambda v: "Receita" if v > 0 else "Despesa"))
+
+    txs = []
+    for t, d, v, c, s, desc in zip(tipo, df["data"], df["valor"], categoria, subcategoria, df["descricao"]):
+        tx = {
+            "tipo": t,
+            "data": d,
+            "valor": float(v),
+            "categoria": c if isinstance(c, str) and c else CATEGORIA_A_CLASSIFICAR,
+            "subcategoria": s if isinstance(s, str) and s else None,
+            "banco": banco,
+            "id_transferencia": None,
+            "descricao": desc,
+        }
+        chave = _chave_transacao(tx)
+        tx["ocorrencia"] = contagem.get(chave, 0)
+        contagem[chave] = tx["ocorrencia"] + 1
+        txs.append(tx)
+    return txs
@@ -0,0 +1,205 @@
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+
+# Ledger (livro-caixa) padrão: o arquivo histórico data/budget.db
+LEDGER_PADRAO = "default"
+DB_PADRAO = "data/budget.db"
+PASTA_LEDGERS = "data/ledgers"
+
+# Limites globais do processo, independentes da quantidade de ledgers
+MAX_CONEXOES = 16
+MAX_CACHES = 8
+
+_NOME_VALIDO = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Ledger explícito do contexto atual (jobs em segundo plano, scripts)
+_ledger_contexto = ContextVar("ledger_contexto", default=None)
+
+# Função que descobre o ledger da sessão Streamlit atual (registrada pela interface)
+_resolvedor = None
+
+
+def validar_nome(nome):
+    if not _NOME_VALIDO.match(nome or ""):
+        raise ValueError(f"Nome de ledger inválido: {nome!r}")
+    return nome
+
+
+def caminho_ledger(nome):
+    if nome == LEDGER_PADRAO:
+        return DB_PADRAO
+    return os.path.join(PASTA_LEDGERS, f"{validar_nome(nome)}.db")
+
+
+def listar_ledgers():
+    """Ledgers existentes em disco (o padrão sempre primeiro)."""
+    nomes = [LEDGER_PADRAO]
+    if os.path.isdir(PASTA_LEDGERS):
+        nomes += sorted(
+            arq[:-3] for arq in os.listdir(PASTA_LEDGERS)
+            if arq.endswith(".db") and _NOME_VALIDO.match(arq[:-3])
+        )
+    return nomes
+
+
+def definir_resolvedor(func):
+    global _resolvedor
+    _resolvedor = func
+
+
+def usar_ledger(nome):
+    """Fixa o ledger do contexto atual (thread ou tarefa); retorna o token para `liberar_ledger`."""
+    return _ledger_contexto.set(validar_nome(nome))
+
+
+def liberar_ledger(token):
+    _ledger_contexto.reset(token)
+
+
+def ledger_atual():
+    nome = _ledger_contexto.get()
+    if nome is None and _resolvedor is not None:
+        nome = _resolvedor()
+    return nome or LEDGER_PADRAO
+
+
+class ConexaoLedger(sqlite3.Connection):
+    """Conexão do pool: `close()` devolve a conexão ao roteador em vez de fechá-la."""
+
+    ledger = None
+    roteador = None
+
+    def close(self):
+        if self.roteador is None:
+            super().close()
+        else:
+            self.roteador.devolver(self)
+
+    def fechar_de_verdade(self):
+        super().close()
+
+
+class RoteadorLedgers:
+    """
+    Mapeia cada ledger para o seu arquivo SQLite e mantém um pool limitado de conexões,
+    com descarte LRU entre ledgers, além de um cache em memória por ledger (também LRU).
+    """
+
+    def __init__(self, max_conexoes=MAX_CONEXOES, max_caches=MAX_CACHES):
+        self.max_conexoes = max_conexoes
+        self.max_caches = max_caches
+        self._lock = threading.RLock()
+        self._ociosas = OrderedDict()   # ledger -> [conexões livres], do menos para o mais recente
+        self._abertas = 0
+        self._caches = OrderedDict()    # ledger -> dict
+        self._preparados = set()
+        self._lock_preparo = threading.Lock()
+        self._ao_preparar = []
+
+    def ao_preparar(self, func):
+        """Registra func(conn) para rodar uma vez por ledger, na primeira conexão do processo."""
+        self._ao_preparar.append(func)
+        return func
+
+    def _abrir(self, ledger):
+        caminho = caminho_ledger(ledger)
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        conn = sqlite3.connect(caminho, factory=ConexaoLedger, check_same_thread=False)
+        conn.ledger = ledger
+        return conn
+
+    def _descartar_lru(self):
+        # fecha conexões ociosas dos ledgers usados há mais tempo até voltar ao limite
+        while self._abertas > self.max_conexoes and self._ociosas:
+            ledger, livres = next(iter(self._ociosas.items()))
+            livres.pop(0).fechar_de_verdade()
+            self._abertas -= 1
+            if not livres:
+                del self._ociosas[ledger]
+
+    def conectar(self, ledger):
+        with self._lock:
+            livres = self._ociosas.get(ledger)
+            if livres:
+                conn = livres.pop()
+                if not livres:
+                    del self._ociosas[ledger]
+            else:
+                conn = self._abrir(ledger)
+                self._abertas += 1
+                self._descartar_lru()
+
+        if ledger not in self._preparados:
+            self._preparar(ledger, conn)
+        conn.roteador = self
+        return conn
+
+    def _preparar(self, ledger, conn):
+        # outras sessões do mesmo ledger esperam o esquema ficar pronto
+        with self._lock_preparo:
+            if ledger in self._preparados:
+                return
+            conn.roteador = None
+            for func in self._ao_preparar:
+                func(conn)
+            self._preparados.add(ledger)
+
+    def devolver(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = None
+        with self._lock:
+            if self._abertas > self.max_conexoes:
+                conn.fechar_de_verdade()
+                self._abertas -= 1
+                return
+            self._ociosas.setdefault(conn.ledger, []).append(conn)
+            self._ociosas.move_to_end(conn.ledger)
+
+    def cache(self, ledger):
+        """Dicionário de cache do ledger; o ledger menos usado perde o cache acima do limite."""
+        with self._lock:
+            cache = self._caches.pop(ledger, None)
+            if cache is None:
+                cache = {}
+            self._caches[ledger] = cache
+            while len(self._caches) > self.max_caches:
+                self._caches.popitem(last=False)
+            return cache
+
+    def invalidar(self, ledger):
+        with self._lock:
+            self._caches.pop(ledger, None)
+
+    def fechar_tudo(self):
+        with self._lock:
+            for livres in self._ociosas.values():
+                for conn in livres:
+                    conn.fechar_de_verdade()
+                    self._abertas -= 1
+            self._ociosas.clear()
+            self._caches.clear()
+
+
+# Roteador único por processo do servidor
+roteador = RoteadorLedgers()
+
+
+def cache_ledger(ledger=None):
+    return roteador.cache(ledger or ledger_atual())
+
+
+def em_cache(chave, calcular, ledger=None):
+    """Valor em cache do ledger para `chave` (calculado na primeira vez)."""
+    cache = cache_ledger(ledger)
+    if chave not in cache:
+        cache[chave] = calcular()
+    return cache[chave]
+
+
+def invalidar_cache(ledger=None):
+    roteador.invalidar(ledger or ledger_atual())
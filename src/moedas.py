@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+from db import MOEDA_PADRAO, load_cotacoes, load_moedas_banco, load_resumo_mensal, load_transacoes, validar_moeda
+from importacao import _normalizar_valor
+from ledgers import em_cache
+
+SIMBOLOS = {"BRL": "R$", "USD": "US$", "EUR": "€", "GBP": "£", "JPY": "¥", "ARS": "AR$", "CHF": "CHF", "CAD": "C$"}
+
+# Nomes aceitos para as colunas do CSV de cotações
+_COLUNAS_CSV = {
+    "data": "data", "date": "data",
+    "moeda": "moeda", "currency": "moeda",
+    "cotacao": "cotacao", "cotação": "cotacao", "taxa": "cotacao", "rate": "cotacao",
+}
+
+
+def simbolo(moeda):
+    return SIMBOLOS.get(moeda, moeda)
+
+
+def formatar(valor, moeda=MOEDA_PADRAO):
+    return f"{simbolo(moeda)} {valor:,.2f}"
+
+
+def ler_cotacoes(arquivo):
+    """
+    Lê um CSV de cotações com as colunas data, moeda e cotacao, onde cotacao é o valor
+    de 1 unidade da moeda em reais (ex.: 2025-01-02,USD,6.18). Retorna um DataFrame
+    pronto para `save_cotacoes`; linhas inválidas são descartadas.
+    """
+    df = pd.read_csv(arquivo, sep=None, engine="python", dtype=str)
+    df.columns = [_COLUNAS_CSV.get(c.strip().lower(), c.strip().lower()) for c in df.columns]
+    faltando = {"data", "moeda", "cotacao"} - set(df.columns)
+    if faltando:
+        raise ValueError(f"CSV de cotações sem as colunas: {', '.join(sorted(faltando))}")
+
+    datas = pd.to_datetime(df["data"].str.strip(), format="mixed", dayfirst=True, errors="coerce")
+    cotacoes = pd.DataFrame({
+        "moeda": df["moeda"].fillna("").str.strip().str.upper(),
+        "data": datas.dt.strftime("%Y-%m-%d"),
+        "cotacao": _normalizar_valor(df["cotacao"]),
+    })
+    validas = cotacoes["data"].notna() & (cotacoes["cotacao"] > 0) & cotacoes["moeda"].str.fullmatch(r"[A-Z]{3,5}")
+    return cotacoes[validas & (cotacoes["moeda"] != MOEDA_PADRAO)].reset_index(drop=True)
+
+
+def _cotacoes():
+    # tabela de cotações do ledger, ordenada por data (cache limpo a cada gravação)
+    return em_cache(("cotacoes",), load_cotacoes)
+
+
+def fatores(moedas, datas, base=MOEDA_PADRAO):
+    """
+    Fator que converte cada valor em `moedas[i]` na data `datas[i]` para `base`, usando a
+    última cotação publicada até a data (antes da primeira cotação, a primeira).
+    Vetorizado com `merge_asof`; NaN onde a moeda não tem cotação.
+    """
+    base = validar_moeda(base)
+    pedidos = pd.DataFrame({
+        "moeda": pd.Series(moedas, dtype=object).to_numpy(),
+        "data": pd.to_datetime(pd.Series(datas).to_numpy()),
+    })
+    pedidos["pos"] = np.arange(len(pedidos))
+
+    cotacoes = _cotacoes()
+    reais = np.full(len(pedidos), np.nan)
+    reais[(pedidos["moeda"] == MOEDA_PADRAO).to_numpy()] = 1.0
+
+    estrangeiras = pedidos[(pedidos["moeda"] != MOEDA_PADRAO) & pedidos["moeda"].isin(cotacoes["moeda"])]
+    if not estrangeiras.empty:
+        ordenados = estrangeiras.sort_values("data", kind="stable")
+        unidas = pd.merge_asof(ordenados, cotacoes, on="data", by="moeda", direction="backward")
+        if unidas["cotacao"].isna().any():
+            # datas anteriores à primeira cotação da moeda
+            primeira = cotacoes.groupby("moeda")["cotacao"].first()
+            unidas["cotacao"] = unidas["cotacao"].fillna(unidas["moeda"].map(primeira))
+        reais[unidas["pos"].to_numpy()] = unidas["cotacao"].to_numpy()
+
+    if base == MOEDA_PADRAO:
+        return reais
+    # valor em reais dividido pelo valor de 1 unidade da base em reais, na mesma data
+    return reais / fatores(np.full(len(pedidos), base, dtype=object), pedidos["data"])
+
+
+def converter(df, base=MOEDA_PADRAO, coluna="valor"):
+    """
+    Converte `df[coluna]` (na moeda da coluna `moeda`, pela cotação da coluna `data`) para
+    `base`, devolvendo uma cópia. Sem nenhuma linha em outra moeda, nada é calculado.
+    Valores sem cotação ficam NaN.
+    """
+    moedas = df["moeda"].astype(object)
+    if df.empty or (moedas == base).all():
+        return df
+    df = df.copy()
+    fator = np.ones(len(df))
+    outras = (moedas != base).to_numpy()
+    fator[outras] = fatores(moedas[outras], df["data"][outras], base)
+    df[coluna] = df[coluna].to_numpy() * fator
+    return df
+
+
+def converter_valor(valor, de, para, data):
+    """Converte um único valor de `de` para `para` na data informada (None sem cotação)."""
+    if de == para:
+        return valor
+    fator = fatores([de], [data], para)[0]
+    return None if np.isnan(fator) else round(valor * fator, 2)
+
+
+def resumo_convertido(base=MOEDA_PADRAO, filters=None):
+    """
+    Resumo mensal (mes, tipo, categoria, subcategoria, banco, total, qtd) com os totais em
+    `base`. As linhas já na moeda base vêm direto do resumo pré-agregado; só os lançamentos
+    em outras moedas são lidos e convertidos um a um pela cotação do dia, e depois agregados.
+    Cache por ledger, período e moeda base.
+    """
+    filters = filters or {}
+
+    def calcular():
+        resumo = load_resumo_mensal(filters)
+        chaves = ["mes", "tipo", "categoria", "subcategoria", "banco"]
+        na_base = resumo[resumo["moeda"] == base].drop(columns="moeda")
+        outras = sorted(set(resumo["moeda"]) - {base})
+        if not outras:
+            return na_base.reset_index(drop=True)
+
+        txs = load_transacoes(
+            filters={**{k: filters.get(k) for k in ("start", "end") if filters.get(k)}, "moeda": outras},
+            columns=["tipo", "data", "valor", "moeda", "categoria", "subcategoria", "banco"],
+        )
+        txs = converter(txs, base)
+        txs["mes"] = txs["data"].dt.strftime("%Y-%m")
+        for coluna in ["subcategoria", "banco"]:
+            txs[coluna] = txs[coluna].astype(object).fillna("")
+        convertidos = (
+            txs.groupby(chaves, observed=True)["valor"]
+            .agg(total="sum", qtd="size")
+            .reset_index()
+        )
+        juntos = convertidos if na_base.empty else pd.concat([na_base, convertidos], ignore_index=True)
+        for coluna in chaves:
+            juntos[coluna] = juntos[coluna].astype(object)
+        return (
+            juntos.groupby(chaves, dropna=False)
+            .agg(total=("total", "sum"), qtd=("qtd", "sum"))
+            .reset_index()
+            .sort_values("mes", kind="stable")
+            .reset_index(drop=True)
+        )
+
+    return em_cache(("resumo_convertido", base, filters.get("start"), filters.get("end")), calcular)
+
+
+def moedas_sem_cotacao(moedas):
+    """Moedas da lista (exceto a padrão) que não têm nenhuma cotação cadastrada."""
+    cadastradas = set(_cotacoes()["moeda"])
+    return sorted({m for m in moedas if m and m != MOEDA_PADRAO} - cadastradas)
+
+
+def moedas_disponiveis():
+    """Moedas que podem ser escolhidas para exibir os valores: a padrão, as dos bancos e as com cotação."""
+    outras = set(load_moedas_banco().values()) | set(_cotacoes()["moeda"])
+    return [MOEDA_PADRAO] + sorted(outras - {MOEDA_PADRAO})
@@ -1,32 +1,45 @@
 import streamlit as st
+import pandas as pd
 from datetime import date, datetime
+import os
 import uuid
 from db import *
+from tarefas import enfileirar, retomar_jobs
+from componentes import painel_jobs, selecionar_ledger
+from classificador import carregar_classificador
+from moedas import converter_valor, formatar
 
 # Função para obter bancos com saldo positivo
 def bancos_com_saldo_positivo():
-    df = load_transacoes()
+    df = load_transacoes(columns=["banco", "valor"])
     if df.empty:
         return []
 
-    df_bancos = df.groupby("banco")["valor"].sum().reset_index()
+    df_bancos = df.groupby("banco", observed=True)["valor"].sum().reset_index()
     return df_bancos[df_bancos["valor"] > 0]["banco"].tolist()
 
+# Posição de um valor nas opções do selectbox (0 se ausente)
+def indice(opcoes, valor):
+    return opcoes.index(valor) if valor in opcoes else 0
+
+# Lançamento idêntico a um já registrado: fica pendente até o usuário confirmar (ou descartar)
+def pedir_confirmacao(txs):
+    st.session_state.duplicata_pendente = {"ledger": ledger, "txs": txs}
+    st.rerun()
+
 # Retorna saldo atual do banco 
 def saldo_banco(banco):
-    df = load_transacoes()
-    if df.empty or banco is None:
-        return 0.0
-    if banco == "Nenhum banco com saldo":
+    if banco is None or banco == "Nenhum banco com saldo":
         return 0.0
-    if "banco" not in df.columns or "valor" not in df.columns:
+    df = load_transacoes(filters={"banco": banco}, columns=["valor"])
+    if df.empty:
         return 0.0
-    saldo = df[df["banco"] == banco]["valor"].sum()
-    return float(saldo)
+    return float(df["valor"].sum())
 
 # Inicialização
+ledger = selecionar_ledger()
 init_db()
-conn = get_connection()
+retomar_jobs()
 
 # Configuração do app
 st.set_page_config(
@@ -68,7 +81,10 @@ with col1:
         st.markdown("<p style='text-align: center'><b>Menu</b></p>", unsafe_allow_html=True)
         st.page_link("app.py", label="Resumo", icon="🧮")
         st.page_link("pages/1_lancamentos.py", label="Lançamentos", icon="📥")
+        st.page_link("pages/3_conciliacao.py", label="Conciliação", icon="🔎")
         st.page_link("pages/2_settings.py", label="Configuração", icon="⚙️")
+        if ledger != "default":
+            st.caption(f"📒 Ledger: {ledger}")
 
 with col2:
     # ----- Formulário -----
@@ -80,21 +96,29 @@ with col2:
 
         salvar = cab_b.button("🚀 Adicionar lançamento", use_container_width=True)
 
+        # sugestão aplicada pelo usuário (pré-seleciona tipo, categoria, subcategoria e banco)
+        sugestao = st.session_state.get("sugestao_aplicada") or {}
+
         # Linha 1
         c1, c2, c3, c4 = st.columns([1,1,1,1])
         data = c1.date_input("Data", date.today())
-        tipo = c2.selectbox("Tipo", ["Receita","Despesa","Investimento","Transferência"])
+        tipos = ["Receita","Despesa","Investimento","Transferência"]
+        tipo = c2.selectbox("Tipo", tipos, index=indice(tipos, sugestao.get("tipo")))
 
         if tipo == "Despesa":
-            categoria = c3.selectbox("Categoria", ["Custos Fixos","Custos Variáveis","Metas","Lazer","Educação"])
-            subcategoria = c4.selectbox("Subcategoria", st.session_state.categorias.get(categoria, []))
+            opcoes = ["Custos Fixos","Custos Variáveis","Metas","Lazer","Educação"]
+            categoria = c3.selectbox("Categoria", opcoes, index=indice(opcoes, sugestao.get("categoria")))
+            opcoes = st.session_state.categorias.get(categoria, [])
+            subcategoria = c4.selectbox("Subcategoria", opcoes, index=indice(opcoes, sugestao.get("subcategoria")))
 
         elif tipo == "Investimento":
             categoria = c3.selectbox("Categoria", ["Investimento"], disabled=True)
-            subcategoria = c4.selectbox("Tipo de Investimento", st.session_state.categorias.get("Investimento", []))
+            opcoes = st.session_state.categorias.get("Investimento", [])
+            subcategoria = c4.selectbox("Tipo de Investimento", opcoes, index=indice(opcoes, sugestao.get("subcategoria")))
 
         else:
-            categoria = c3.selectbox("Categoria", st.session_state.categorias.get(tipo, []))
+            opcoes = st.session_state.categorias.get(tipo, [])
+            categoria = c3.selectbox("Categoria", opcoes, index=indice(opcoes, sugestao.get("categoria")))
             subcategoria = c4.selectbox("Subcategoria", st.session_state.categorias.get(categoria, []), disabled=True)
 
 
@@ -105,21 +129,28 @@ with col2:
         bancos_todos = st.session_state.categorias.get("Banco", [])
         # dicionário com saldos por banco
         bank_saldos = {b: saldo_banco(b) for b in bancos_todos}
+        # moeda de cada banco (saldos exibidos na moeda do próprio banco)
+        moedas_banco = load_moedas_banco()
+        moeda_de = lambda b: moedas_banco.get(b, MOEDA_PADRAO)
 
         # labels com saldo para exibição no selectbox
-        bancos_todos_labels = [f"{b} (Saldo: R$ {bank_saldos.get(b, 0.0):,.2f})" for b in bancos_todos]
+        bancos_todos_labels = [f"{b} (Saldo: {formatar(bank_saldos.get(b, 0.0), moeda_de(b))})" for b in bancos_todos]
         # mapeamento label -> banco original
         label_to_bank = {lbl: b for lbl, b in zip(bancos_todos_labels, bancos_todos)}
 
         # bancos com saldo positivo (labels)
         bancos_positivos = [b for b, s in bank_saldos.items() if s > 0]
-        bancos_positivos_labels = [f"{b} (Saldo: R$ {bank_saldos.get(b, 0.0):,.2f})" for b in bancos_positivos]
+        bancos_positivos_labels = [f"{b} (Saldo: {formatar(bank_saldos.get(b, 0.0), moeda_de(b))})" for b in bancos_positivos]
+
+        # label do banco sugerido, se houver
+        label_sugerido = next((lbl for lbl, b in label_to_bank.items() if b == sugestao.get("banco")), None)
 
         valor = c5.number_input("Valor", min_value=0.0, step=50.0)
 
         # ----------------- RECEITA -----------------
         if tipo == "Receita":
-            selected_label = c6.selectbox("Banco", bancos_todos_labels if bancos_todos_labels else ["Nenhum banco cadastrado"])
+            selected_label = c6.selectbox("Banco", bancos_todos_labels if bancos_todos_labels else ["Nenhum banco cadastrado"],
+                                          index=indice(bancos_todos_labels, label_sugerido))
             banco = label_to_bank.get(selected_label, selected_label)
             para_banco =  c7.selectbox("Para", bancos_todos_labels if bancos_todos_labels else ["Nenhum banco cadastrado"], disabled=True)
             para_banco = label_to_bank.get(para_banco, para_banco)
@@ -127,7 +158,7 @@ with col2:
         # -------------- DESPESA / INVESTIMENTO -----------------
         elif tipo in ["Despesa", "Investimento"]:
             if bancos_positivos_labels:
-                selected_label = c6.selectbox("Banco", bancos_positivos_labels)
+                selected_label = c6.selectbox("Banco", bancos_positivos_labels, index=indice(bancos_positivos_labels, label_sugerido))
                 banco = label_to_bank.get(selected_label, selected_label)
             else:
                 selected_label = c6.selectbox("Banco", ["Nenhum banco com saldo"])
@@ -153,6 +184,40 @@ with col2:
         # Descrição
         descricao = c8.text_input("Descrição")
 
+        # Sugestão de classificação (regras + histórico de descrições)
+        if descricao and tipo != "Transferência":
+            sugerido = carregar_classificador().classificar(descricao)
+            atual = {"tipo": tipo, "categoria": categoria, "subcategoria": subcategoria}
+            if sugerido and any(sugerido[k] != atual[k] for k in atual if sugerido[k]):
+                s1, s2 = st.columns([3, 1])
+                caminho = " › ".join(v for v in [sugerido["tipo"], sugerido["categoria"], sugerido["subcategoria"], sugerido["banco"]] if v)
+                s1.caption(f"💡 Sugestão ({sugerido['origem']}): {caminho}")
+                if s2.button("Aplicar sugestão", use_container_width=True):
+                    st.session_state.sugestao_aplicada = sugerido
+                    st.rerun()
+
+
+        # mesmo dia, tipo, valor, banco e descrição de um lançamento existente: outro lançamento ou clique repetido?
+        pendente = st.session_state.get("duplicata_pendente")
+        if pendente and pendente["ledger"] == ledger:
+            d1, d2, d3 = st.columns([3, 1, 1])
+            registrar = d2.button("Registrar mesmo assim", use_container_width=True)
+            descartar = d3.button("Descartar", use_container_width=True)
+            if registrar:
+                txs = pendente["txs"]
+                if len(txs) == 2:
+                    insert_transferencia(*txs, forcar=True)
+                else:
+                    insert_transacao(txs[0], forcar=True)
+                st.session_state.pop("duplicata_pendente")
+                st.session_state.pop("sugestao_aplicada", None)
+                d1.success("Lançamento registrado.")
+            elif descartar:
+                st.session_state.pop("duplicata_pendente")
+                d1.info("Lançamento descartado.")
+            else:
+                d1.warning("Já existe um lançamento idêntico (mesma data, tipo, valor, banco e descrição). "
+                           "Registre mesmo assim se for outro lançamento.")
 
         if salvar:
             # ---------------- Transferência ----------------
@@ -168,8 +233,13 @@ with col2:
                             st.error("Não há banco com saldo disponível para realizar a transferência.")
                         else:
                             disponivel = saldo_banco(de_banco)
+                            # entre moedas diferentes, o destino recebe o valor convertido pela cotação do dia
+                            valor_destino = converter_valor(valor, moeda_de(de_banco), moeda_de(para_banco), data)
                             if valor > disponivel:
-                                st.error(f"Saldo insuficiente em {de_banco}: R$ {disponivel:,.2f}")
+                                st.error(f"Saldo insuficiente em {de_banco}: {formatar(disponivel, moeda_de(de_banco))}")
+                            elif valor_destino is None:
+                                st.error(f"Sem cotação para converter {moeda_de(de_banco)} em {moeda_de(para_banco)}. "
+                                         "Importe as cotações em Configuração.")
                             else:
                                 transfer_id = str(uuid.uuid4())
                                 categoria = "Transferência"
@@ -186,12 +256,13 @@ with col2:
                                     "descricao": descricao
                                 }
                                 tx_in = tx_out.copy()
-                                tx_in["valor"] = valor
+                                tx_in["valor"] = valor_destino
                                 tx_in["banco"] = para_banco
 
-                                insert_transacao(tx_out)
-                                insert_transacao(tx_in)
-                                st.success(f"Transferência registrada: {de_banco} → {para_banco}")
+                                if insert_transferencia(tx_out, tx_in):
+                                    st.success(f"Transferência registrada: {de_banco} → {para_banco}")
+                                else:
+                                    pedir_confirmacao([tx_out, tx_in])
 
                 # ---------------- Investimento ----------------
                 elif tipo == "Investimento":
@@ -201,7 +272,7 @@ with col2:
                     else:
                         disponivel = saldo_banco(banco)
                         if valor > disponivel:
-                            st.error(f"Saldo insuficiente em {banco}: R$ {disponivel:,.2f}")
+                            st.error(f"Saldo insuficiente em {banco}: {formatar(disponivel, moeda_de(banco))}")
                         else:
                             # investimento sempre: 1 lançamento (saída)
                             tx = {
@@ -215,8 +286,11 @@ with col2:
                                 "descricao": descricao
                             }
 
-                            insert_transacao(tx)
-                            st.success(f"Investimento registrado em {subcategoria} (banco {banco})")
+                            if insert_transacao(tx):
+                                st.success(f"Investimento registrado em {subcategoria} (banco {banco})")
+                                st.session_state.pop("sugestao_aplicada", None)
+                            else:
+                                pedir_confirmacao([tx])
 
                 # ---------------- Receita ----------------
                 elif tipo == "Receita":
@@ -230,8 +304,11 @@ with col2:
                         "id_transferencia": None,
                         "descricao": descricao
                     }
-                    insert_transacao(tx)
-                    st.success(f"Receita de R$ {valor:,.2f} registrada em {banco}")
+                    if insert_transacao(tx):
+                        st.success(f"Receita de {formatar(valor, moeda_de(banco))} registrada em {banco}")
+                        st.session_state.pop("sugestao_aplicada", None)
+                    else:
+                        pedir_confirmacao([tx])
 
 
                 # ---------------- Despesa ----------------
@@ -242,7 +319,7 @@ with col2:
                     else:
                         disponivel = saldo_banco(banco)
                         if valor > disponivel:
-                            st.error(f"Saldo insuficiente em {banco}: R$ {disponivel:,.2f}")
+                            st.error(f"Saldo insuficiente em {banco}: {formatar(disponivel, moeda_de(banco))}")
                         else:
                             tx = {
                                 "tipo": tipo,
@@ -254,23 +331,70 @@ with col2:
                                 "id_transferencia": None,
                                 "descricao": descricao
                             }
-                            insert_transacao(tx)
-                            st.success(f"Despesa de R$ {valor:,.2f} registrada em {banco}")
+                            if insert_transacao(tx):
+                                st.success(f"Despesa de {formatar(valor, moeda_de(banco))} registrada em {banco}")
+                                st.session_state.pop("sugestao_aplicada", None)
+                            else:
+                                pedir_confirmacao([tx])
+
 
+    # ----- Importação de extrato -----
+    with st.container(border=True):
+        imp_a, imp_b, imp_c = st.columns([3, 1, 1])
+        imp_a.markdown("#### 📄 Importar Extrato")
+        arquivo = imp_a.file_uploader("Arquivo CSV (colunas: data, valor, descricao)", type=["csv"])
+        banco_import = imp_b.selectbox("Banco do extrato", bancos_todos if bancos_todos else ["Nenhum banco cadastrado"])
+        importar = imp_c.button("📥 Importar", use_container_width=True, disabled=arquivo is None or not bancos_todos)
+
+        if importar:
+            # o arquivo fica salvo em disco para que a importação possa ser retomada
+            os.makedirs("data/importacoes", exist_ok=True)
+            destino = os.path.join("data/importacoes", f"{uuid.uuid4()}_{os.path.basename(arquivo.name)}")
+            with open(destino, "wb") as f:
+                f.write(arquivo.getbuffer())
+            enfileirar("importar_extrato", arquivo=destino, banco=banco_import)
+
+        painel_jobs(tipos=["importar_extrato"])
 
     # ----- Transações -----
     with st.container(border=True):
-        col1, col2, col3 = st.columns([4, 1, 1])
+        col1, col5, col2, col3, col4 = st.columns([2, 1, 1, 1, 1])
 
         with col1:
             st.markdown("#### 💲 Transações")
-
-        df = load_transacoes()
+            # a categoria só é editável com um tipo filtrado: as opções dependem do tipo
+            filtro_tipo = st.selectbox("Filtrar por tipo", ["Todos", "Receita", "Despesa", "Investimento", "Transferência"],
+                                       key="filtro_tipo_transacoes", label_visibility="collapsed")
+
+        with col4:
+            # desfazer a última exclusão (restaura o lote inteiro)
+            ultimo_lote = load_ultimo_lote_exclusao()
+            desfazer = st.button(
+                f"↩️ Desfazer exclusão ({ultimo_lote['qtd']})" if ultimo_lote else "↩️ Desfazer exclusão",
+                use_container_width=True,
+                disabled=ultimo_lote is None
+            )
+            if desfazer:
+                restaurados, ignorados = desfazer_exclusao(ultimo_lote["id"])
+                if ignorados:
+                    # a tabela abaixo já vem atualizada; sem rerun para o aviso continuar visível
+                    st.warning(f"{restaurados} lançamentos restaurados; {ignorados} continuam excluídos porque hoje "
+                               "duplicariam um lançamento ativo (transferências só voltam com as duas pernas).")
+                else:
+                    st.success(f"{restaurados} lançamentos restaurados.")
+                    st.rerun()
+
+        df = load_transacoes(filters={"tipo": filtro_tipo})
         
         if not df.empty:
             df_disp = df.copy()
-            df_disp["valor"] = df_disp["valor"].map(lambda x: f"R$ {x:,.2f}")
+            # colunas category viram texto para aceitar qualquer opção nas células editáveis
+            for c in ["tipo", "moeda", "categoria", "subcategoria", "banco", "id_transferencia", "descricao"]:
+                df_disp[c] = df_disp[c].astype(object)
             df_disp["Excluir?"] = False
+
+            with col5:
+                salvar_edicoes = st.button("💾 Salvar alterações", use_container_width=True)
             
             with col2:
                 # Checkbox para selecionar tudo
@@ -282,22 +406,77 @@ with col2:
             with col3:
                 excluir_selec = st.button("Excluir selecionados", use_container_width=True)
 
+            # opções das células editáveis conforme o tipo filtrado (inclui valores já gravados fora das listas atuais)
+            cats = st.session_state.categorias
+            opcoes_categoria = {
+                "Receita": cats.get("Receita", []) + [CATEGORIA_A_CLASSIFICAR],
+                "Despesa": GRUPOS_DESPESA + [CATEGORIA_A_CLASSIFICAR],
+                "Investimento": ["Investimento"],
+            }.get(filtro_tipo, [])
+            opcoes_subcategoria = [] if filtro_tipo == "Receita" else [s for c in opcoes_categoria for s in cats.get(c, [])]
+            opcoes_banco = list(cats.get("Banco", []))
+            bloqueadas = ["tipo", "moeda", "id_transferencia"]
+            if not opcoes_categoria:
+                bloqueadas += ["categoria", "subcategoria"]
+                if filtro_tipo == "Todos":
+                    st.caption("Filtre um tipo para editar a categoria dos lançamentos.")
+            elif filtro_tipo == "Receita":
+                bloqueadas.append("subcategoria")
+
+            def opcoes(lista, coluna):
+                return list(dict.fromkeys(lista + df_disp[coluna].dropna().tolist()))
+
+            # a chave acompanha as linhas exibidas: se a tabela mudar, edições pendentes não caem em outra linha
+            chave_editor = f"editor_transacoes_{pd.util.hash_array(df['id'].to_numpy()).sum()}"
+
             # Exibir tabela sem a coluna id
             edited = st.data_editor(
                 df_disp.drop(columns=["id"]),
+                key=chave_editor,
                 num_rows="fixed",
                 hide_index=True,
-                use_container_width=True
+                use_container_width=True,
+                disabled=bloqueadas,
+                column_config={
+                    "data": st.column_config.DateColumn("data", format="YYYY-MM-DD"),
+                    "valor": st.column_config.NumberColumn("valor", format="%.2f", step=0.01),
+                    "categoria": st.column_config.SelectboxColumn("categoria", options=opcoes(opcoes_categoria, "categoria")),
+                    "subcategoria": st.column_config.SelectboxColumn("subcategoria", options=opcoes(opcoes_subcategoria, "subcategoria")),
+                    "banco": st.column_config.SelectboxColumn("banco", options=opcoes(opcoes_banco, "banco")),
+                }
             )
 
+            # Gravar apenas as células alteradas (delta do editor), por id
+            if salvar_edicoes:
+                alteradas = st.session_state[chave_editor]["edited_rows"]
+                alteracoes = {
+                    int(df["id"].iloc[int(pos)]): {c: v for c, v in campos.items() if c in COLUNAS_EDITAVEIS}
+                    for pos, campos in alteradas.items()
+                }
+                if not any(alteracoes.values()):
+                    st.info("Nenhuma alteração para salvar.")
+                else:
+                    try:
+                        qtd = update_transacoes(alteracoes)
+                    except ValueError as e:
+                        st.error(str(e))
+                    else:
+                        del st.session_state[chave_editor]
+                        st.success(f"{qtd} lançamentos atualizados.")
+                        st.rerun()
+
             # Mapear IDs dos registros marcados para exclusão
             # Usar posições (iloc) para garantir alinhamento correto
             excluir_positions = [i for i, v in enumerate(edited["Excluir?"].tolist()) if v]
             excluir_ids = df.iloc[excluir_positions]["id"].tolist()
 
             if excluir_ids and excluir_selec:
-                delete_transacoes(excluir_ids)
-                st.success(f"{len(excluir_ids)} lançamentos excluídos.")
+                if len(excluir_ids) == len(df):
+                    # todos marcados: exclusão por predicado (o mesmo filtro da tabela), sem enviar a lista de ids
+                    _, qtd = delete_transacoes(filters={"tipo": filtro_tipo})
+                else:
+                    _, qtd = delete_transacoes(excluir_ids)
+                st.success(f"{qtd} lançamentos excluídos.")
                 st.rerun()
         else:
             st.info("Nenhum lançamento encontrado.")
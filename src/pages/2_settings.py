@@ -2,9 +2,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from db import *
+from tarefas import enfileirar, retomar_jobs
+from componentes import painel_jobs, selecionar_ledger
+from backup import listar_backups, pasta_backups, INTERVALO_HORAS, RETENCAO
+from moedas import ler_cotacoes
 
 # Inicialização do banco de dados
+ledger = selecionar_ledger()
 init_db()
+retomar_jobs()
 
 # Configuração do app
 st.set_page_config(
@@ -61,7 +67,10 @@ with col1:
         st.markdown("<p style='text-align: center'><b>Menu</b></p>", unsafe_allow_html=True)
         st.page_link("app.py", label="Resumo", icon="🧮")
         st.page_link("pages/1_lancamentos.py", label="Lançamentos", icon="📥")
+        st.page_link("pages/3_conciliacao.py", label="Conciliação", icon="🔎")
         st.page_link("pages/2_settings.py", label="Configuração", icon="⚙️")
+        if ledger != "default":
+            st.caption(f"📒 Ledger: {ledger}")
 
 with col2:
     ## Orçamento Alvo ----------
@@ -218,3 +227,137 @@ with col2:
             st.session_state.categorias = default_categorias.copy()
             save_categorias(default_categorias)
             st.rerun()
+
+    ## Regras de classificação ----------
+    with st.container(border=True):
+        header_left, btn1_col, btn2_col = st.columns([2, 1, 1])
+        with header_left:
+            st.markdown("#### 🧠 Regras de Classificação")
+            st.markdown("Lançamentos cuja descrição contém o texto da regra recebem a classificação indicada.")
+        with btn1_col:
+            salvar_regras = st.button("Salvar Regras", use_container_width=True)
+        with btn2_col:
+            classificar = st.button("Classificar Pendentes", use_container_width=True)
+
+        cats = st.session_state.categorias
+        opcoes_categoria = cats.get("Receita", []) + desp_titles + ["Investimento"]
+        opcoes_subcategoria = sorted({sub for titulo in desp_titles + ["Investimento"] for sub in cats.get(titulo, [])})
+
+        regras_editadas = st.data_editor(
+            load_regras(),
+            num_rows="dynamic",
+            key="regras_editor",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "padrao": st.column_config.TextColumn("Texto na descrição", required=True),
+                "tipo": st.column_config.SelectboxColumn("Tipo", options=["Receita", "Despesa", "Investimento"], required=True),
+                "categoria": st.column_config.SelectboxColumn("Categoria", options=opcoes_categoria, required=True),
+                "subcategoria": st.column_config.SelectboxColumn("Subcategoria", options=opcoes_subcategoria),
+                "banco": st.column_config.SelectboxColumn("Banco", options=cats.get("Banco", [])),
+            }
+        )
+
+        if salvar_regras:
+            validas = regras_editadas.dropna(subset=["padrao", "tipo", "categoria"])
+            validas = validas[validas["padrao"].str.strip() != ""]
+            save_regras(validas.to_dict("records"))
+            st.success(f"{len(validas)} regras salvas! 💾")
+
+        if classificar:
+            enfileirar("classificar_pendentes")
+
+        painel_jobs(tipos=["classificar_pendentes"])
+
+    ## Moedas e câmbio ----------
+    with st.container(border=True):
+        header_left, btn1_col = st.columns([3, 1])
+        with header_left:
+            st.markdown("#### 💱 Moedas e Câmbio")
+            st.markdown(f"Cada banco tem uma moeda (padrão {MOEDA_PADRAO}); os lançamentos do banco ficam nessa moeda. "
+                        f"As cotações convertem os valores para a moeda escolhida no Resumo.")
+        with btn1_col:
+            salvar_moedas = st.button("Salvar Moedas", use_container_width=True)
+
+        col_bancos, col_cotacoes = st.columns(2)
+        with col_bancos:
+            moedas_banco = load_moedas_banco()
+            bancos = st.session_state.categorias.get("Banco", [])
+            moedas_editadas = st.data_editor(
+                pd.DataFrame({"banco": bancos, "moeda": [moedas_banco.get(b, MOEDA_PADRAO) for b in bancos]}),
+                num_rows="fixed",
+                key="moedas_editor",
+                use_container_width=True,
+                hide_index=True,
+                disabled=["banco"],
+                column_config={
+                    "banco": st.column_config.TextColumn("Banco"),
+                    "moeda": st.column_config.TextColumn("Moeda (código ISO)", required=True, max_chars=5),
+                }
+            )
+
+        with col_cotacoes:
+            arquivo_cotacoes = st.file_uploader(
+                f"Cotações CSV (colunas: data, moeda, cotacao = valor de 1 unidade em {MOEDA_PADRAO})", type=["csv"]
+            )
+            if arquivo_cotacoes is not None and st.button("Importar Cotações", use_container_width=True):
+                try:
+                    qtd = save_cotacoes(ler_cotacoes(arquivo_cotacoes))
+                    st.success(f"{qtd} cotações importadas! 💾")
+                except ValueError as e:
+                    st.error(str(e))
+
+            cobertura = load_resumo_cotacoes()
+            if not cobertura.empty:
+                st.dataframe(
+                    cobertura.rename(columns={"moeda": "Moeda", "desde": "Desde", "ate": "Até", "cotacoes": "Cotações"}),
+                    hide_index=True,
+                    use_container_width=True
+                )
+
+        if salvar_moedas:
+            novas = {
+                banco: moeda for banco, moeda in zip(moedas_editadas["banco"], moedas_editadas["moeda"].fillna(MOEDA_PADRAO))
+                if moeda.strip().upper() != MOEDA_PADRAO
+            }
+            try:
+                save_moedas_banco(novas)
+                st.success("Moedas salvas! 💾")
+            except ValueError as e:
+                st.error(str(e))
+
+    ## Manutenção ----------
+    with st.container(border=True):
+        header_left, btn1_col, btn2_col, btn3_col, btn4_col = st.columns([2, 1, 1, 1, 1])
+        with header_left:
+            st.markdown("#### 🛠️ Manutenção")
+            st.markdown("As operações rodam em segundo plano; é possível continuar usando o app.")
+        with btn1_col:
+            if st.button("Recalcular Resumos", use_container_width=True):
+                enfileirar("reconstruir_resumo")
+        with btn2_col:
+            if st.button("Reindexar Banco de Dados", use_container_width=True):
+                enfileirar("reindexar")
+        with btn3_col:
+            if st.button("Fazer Backup Agora", use_container_width=True):
+                enfileirar("backup")
+        with btn4_col:
+            # lançamentos excluídos vão para data/arquivo/<ledger>.db (o último lote fica, para desfazer)
+            if st.button("Arquivar Excluídos", use_container_width=True):
+                enfileirar("arquivar")
+
+        painel_jobs(tipos=["reconstruir_resumo", "reindexar", "backup", "arquivar"])
+
+        # cópias locais (backup automático a cada INTERVALO_HORAS, mantendo as RETENCAO mais recentes)
+        backups = listar_backups()
+        if backups:
+            st.caption(f"💾 Backups automáticos a cada {INTERVALO_HORAS}h; são mantidas as {RETENCAO} cópias mais recentes em `{pasta_backups()}`.")
+            st.dataframe(
+                pd.DataFrame(backups).assign(tamanho=lambda df: (df["tamanho"] / 2**20).round(1)).rename(
+                    columns={"arquivo": "Arquivo", "data": "Data", "tamanho": "Tamanho (MB)"}
+                ),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption("💾 Nenhum backup ainda; o primeiro é feito automaticamente em segundo plano.")
@@ -0,0 +1,137 @@
+import streamlit as st
+from db import *
+from tarefas import retomar_jobs
+from componentes import selecionar_ledger
+from conciliacao import carregar_extrato, conciliar, JANELA_DIAS
+from moedas import formatar
+
+# Inicialização
+ledger = selecionar_ledger()
+init_db()
+retomar_jobs()
+
+# Configuração do app
+st.set_page_config(
+    page_title="My Budget",
+    page_icon="💰",
+    layout="wide"
+)
+
+st.markdown("""
+    <style>
+        .block-container { padding-left: 2rem; padding-right: 2rem; }
+    </style>
+    """, unsafe_allow_html=True)
+
+# categorias (lista de bancos)
+if "categorias" not in st.session_state:
+    st.session_state.categorias = load_categorias({"Banco": []})
+
+
+# -------- Layout --------
+col1, col2 = st.columns([1, 6])
+with col1:
+    with st.container(border=True):
+        st.markdown("<p style='text-align: center'><b>Menu</b></p>", unsafe_allow_html=True)
+        st.page_link("app.py", label="Resumo", icon="🧮")
+        st.page_link("pages/1_lancamentos.py", label="Lançamentos", icon="📥")
+        st.page_link("pages/3_conciliacao.py", label="Conciliação", icon="🔎")
+        st.page_link("pages/2_settings.py", label="Configuração", icon="⚙️")
+        if ledger != "default":
+            st.caption(f"📒 Ledger: {ledger}")
+
+with col2:
+    # ----- Extrato -----
+    with st.container(border=True):
+        st.markdown("#### 🔎 Conciliação Bancária")
+        st.markdown("Confira os lançamentos de um banco contra o extrato: cada linha do extrato é pareada "
+                    "com um lançamento de mesmo valor e data próxima.")
+
+        c1, c2, c3, c4 = st.columns([3, 1, 1, 1])
+        arquivo = c1.file_uploader("Extrato CSV (colunas: data, valor, descricao e, opcionalmente, saldo)", type=["csv"])
+        bancos = st.session_state.categorias.get("Banco", [])
+        banco = c2.selectbox("Banco", bancos if bancos else ["Nenhum banco cadastrado"])
+        janela = c3.number_input("Tolerância (dias)", min_value=0, max_value=15, value=JANELA_DIAS, step=1)
+        executar = c4.button("🔎 Conciliar", use_container_width=True, disabled=arquivo is None or not bancos)
+
+        if executar:
+            try:
+                with st.spinner("Conciliando..."):
+                    st.session_state.conciliacao = conciliar(carregar_extrato(arquivo), banco, int(janela))
+                    st.session_state.conciliacao["ledger"] = ledger
+            except ValueError as e:
+                st.error(str(e))
+
+    resultado = st.session_state.get("conciliacao")
+    if resultado and resultado.get("ledger") == ledger:
+        pares = resultado["pares"]
+        totais = resultado["totais"]
+        # valores do extrato e do ledger na moeda do banco conciliado
+        moeda = load_moedas_banco().get(resultado["banco"], MOEDA_PADRAO)
+
+        # ----- Resumo -----
+        with st.container(border=True):
+            st.markdown(f"#### 📋 {resultado['banco']}: {totais['inicio']:%d/%m/%Y} a {totais['fim']:%d/%m/%Y}")
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Pareados", f"{len(pares):,}", f"{int(pares['conciliado'].sum()):,} já conciliados", delta_color="off")
+            m2.metric("Só no extrato", f"{len(resultado['so_extrato']):,}")
+            m3.metric("Só no ledger", f"{len(resultado['so_ledger']):,}")
+            m4.metric("Diferença no período", formatar(totais['diferenca'], moeda),
+                      f"extrato {formatar(totais['extrato'], moeda)} · ledger {formatar(totais['ledger'], moeda)}", delta_color="off")
+
+        # ----- Detalhes -----
+        with st.container(border=True):
+            aba_pares, aba_extrato, aba_ledger, aba_saldos = st.tabs([
+                "✅ Pareados", "📄 Só no extrato", "📒 Só no ledger", "⚖️ Saldos divergentes"
+            ])
+
+            with aba_pares:
+                pendentes = pares[~pares["conciliado"]]
+                if pendentes.empty:
+                    st.info("Nenhum pareamento pendente de confirmação.")
+                else:
+                    p1, p2 = st.columns([3, 1])
+                    p1.caption(f"{len(pendentes):,} pareamentos aguardando confirmação "
+                               "(desmarque os que não correspondem ao mesmo lançamento).")
+                    confirmar = p2.button("✅ Confirmar selecionados", use_container_width=True)
+
+                    df_disp = pendentes.drop(columns=["id", "conciliado"]).copy()
+                    df_disp["valor"] = df_disp["valor"].map(lambda x: formatar(x, moeda))
+                    df_disp.insert(0, "Confirmar?", True)
+                    editado = st.data_editor(
+                        df_disp,
+                        num_rows="fixed",
+                        hide_index=True,
+                        use_container_width=True,
+                        disabled=[c for c in df_disp.columns if c != "Confirmar?"],
+                    )
+
+                    if confirmar:
+                        # posições marcadas -> ids; todos confirmados em um único UPDATE
+                        marcados = editado["Confirmar?"].to_numpy()
+                        ids = pendentes["id"].to_numpy()[marcados].tolist()
+                        qtd = conciliar_transacoes(ids)
+                        pares.loc[pares["id"].isin(ids), "conciliado"] = True
+                        st.success(f"{qtd} lançamentos conciliados.")
+                        st.rerun()
+
+            with aba_extrato:
+                if resultado["so_extrato"].empty:
+                    st.info("Todas as linhas do extrato têm lançamento correspondente.")
+                else:
+                    st.caption("Linhas do extrato sem lançamento de mesmo valor dentro da tolerância (ex.: tarifas não lançadas).")
+                    st.dataframe(resultado["so_extrato"], hide_index=True, use_container_width=True)
+
+            with aba_ledger:
+                if resultado["so_ledger"].empty:
+                    st.info("Todos os lançamentos do período aparecem no extrato.")
+                else:
+                    st.caption("Lançamentos do período que não aparecem no extrato (ex.: lançados em duplicidade ou no banco errado).")
+                    st.dataframe(resultado["so_ledger"].drop(columns=["id"]), hide_index=True, use_container_width=True)
+
+            with aba_saldos:
+                if resultado["saldos"].empty:
+                    st.info("Saldos conferem (ou o extrato não informa saldo).")
+                else:
+                    st.caption("Dias em que o saldo do extrato difere do saldo do banco no ledger.")
+                    st.dataframe(resultado["saldos"], hide_index=True, use_container_width=True)
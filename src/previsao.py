@@ -0,0 +1,134 @@
+import calendar
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Quantidade máxima de meses fechados usados no modelo (custo constante mesmo com anos de histórico)
+HISTORICO_MESES = 24
+
+TIPOS_GASTO = ["Despesa", "Investimento"]
+
+
+def _mes(d):
+    return f"{d.year}-{d.month:02d}"
+
+
+def _meses_entre(inicio, fim):
+    """Lista de meses 'AAAA-MM' de inicio até fim (inclusive)."""
+    return pd.period_range(inicio, fim, freq="M").strftime("%Y-%m").tolist()
+
+
+def holt(matriz, alpha=0.5, beta=0.2, minimo=0.0):
+    """
+    Suavização exponencial de Holt (nível + tendência), vetorizada sobre as linhas.
+    Cada linha da matriz é uma série mensal; retorna a previsão do próximo mês por linha,
+    limitada inferiormente por `minimo` (None para não limitar).
+    """
+    matriz = np.asarray(matriz, dtype=np.float64)
+    if matriz.ndim != 2 or matriz.shape[1] == 0:
+        return np.zeros(matriz.shape[0] if matriz.ndim == 2 else 0)
+
+    nivel = matriz[:, 0].copy()
+    tendencia = np.zeros_like(nivel)
+    for t in range(1, matriz.shape[1]):
+        anterior = nivel
+        nivel = alpha * matriz[:, t] + (1 - alpha) * (nivel + tendencia)
+        tendencia = beta * (nivel - anterior) + (1 - beta) * tendencia
+    previsao = nivel + tendencia
+    return previsao if minimo is None else np.maximum(previsao, minimo)
+
+
+def _historico(resumo, hoje):
+    """Meses fechados usados como histórico (a partir do primeiro mês com lançamentos)."""
+    mes_atual = _mes(hoje)
+    fechados = resumo.loc[resumo["mes"] < mes_atual, "mes"]
+    if fechados.empty:
+        return []
+    meses = _meses_entre(fechados.min(), (pd.Period(mes_atual, freq="M") - 1).strftime("%Y-%m"))
+    return meses[-HISTORICO_MESES:]
+
+
+def _pivot(df, chave, meses, valores):
+    tab = df.pivot_table(index=chave, columns="mes", values=valores, aggfunc="sum", fill_value=0.0)
+    return tab.reindex(columns=meses, fill_value=0.0)
+
+
+def _janela(inicio, fim, hoje):
+    """
+    Divide o período em: meses já fechados, mês corrente (com fração restante) e meses futuros.
+    """
+    mes_atual = _mes(hoje)
+    meses = _meses_entre(inicio[:7], fim[:7])
+    dias_mes = calendar.monthrange(hoje.year, hoje.month)[1]
+    restante = 1 - hoje.day / dias_mes
+    tem_atual = mes_atual in meses
+    futuros = sum(1 for m in meses if m > mes_atual)
+    return tem_atual, restante, futuros
+
+
+def projetar_categorias(resumo, inicio, fim, hoje=None):
+    """
+    Projeta o gasto por categoria ao fim do período [inicio, fim].
+
+    Combina o realizado no período, os custos fixos recorrentes ainda não lançados no mês
+    corrente e uma previsão de Holt sobre o histórico mensal para o restante do período.
+    Retorna uma Series categoria -> gasto projetado (positivo).
+    """
+    hoje = hoje or date.today()
+    if resumo.empty:
+        return pd.Series(dtype="float64")
+
+    gastos = resumo[resumo["tipo"].isin(TIPOS_GASTO)].assign(gasto=lambda d: -d["total"])
+    no_periodo = gastos[(gastos["mes"] >= inicio[:7]) & (gastos["mes"] <= fim[:7])]
+    realizado = no_periodo.groupby("categoria")["gasto"].sum()
+
+    tem_atual, restante, futuros = _janela(inicio, fim, hoje)
+    meses = _historico(gastos, hoje)
+    if not meses or (not tem_atual and futuros == 0):
+        return realizado
+
+    # previsão mensal por categoria (todas as séries de uma vez)
+    tab = _pivot(gastos, "categoria", meses, "gasto")
+    previsto = pd.Series(holt(tab.to_numpy()), index=tab.index)
+
+    # custos fixos recorrentes: subcategorias do último mês fechado (valor conhecido, não estimado)
+    fixos = gastos[gastos["categoria"] == "Custos Fixos"]
+    recorrentes = fixos[fixos["mes"] == meses[-1]].groupby("subcategoria")["gasto"].sum().clip(lower=0)
+    if not recorrentes.empty:
+        previsto.loc["Custos Fixos"] = recorrentes.sum()
+
+    restante_periodo = previsto * (futuros + (restante if tem_atual else 0))
+    if tem_atual and not recorrentes.empty:
+        # no mês corrente, só entram os fixos que ainda não foram lançados
+        lancados = fixos.loc[fixos["mes"] == _mes(hoje), "subcategoria"].unique()
+        pendentes = recorrentes.drop(lancados, errors="ignore").sum()
+        restante_periodo.loc["Custos Fixos"] = recorrentes.sum() * futuros + pendentes
+
+    return realizado.add(restante_periodo, fill_value=0.0)
+
+
+def projetar_bancos(resumo, inicio, fim, hoje=None):
+    """
+    Projeta a variação de saldo por banco do dia de hoje até o fim do período (mesmo que
+    o período comece depois de hoje).
+    Retorna uma Series banco -> variação projetada (somar ao saldo atual).
+    """
+    hoje = hoje or date.today()
+    if resumo.empty:
+        return pd.Series(dtype="float64")
+
+    # o saldo de partida é o de hoje: para um período futuro, os meses até o início também contam
+    inicio = min(inicio, hoje.isoformat())
+    tem_atual, restante, futuros = _janela(inicio, fim, hoje)
+    meses = _historico(resumo, hoje)
+    if not meses or (not tem_atual and futuros == 0):
+        return pd.Series(dtype="float64")
+
+    fluxos = resumo[resumo["banco"] != ""]
+    if fluxos.empty:
+        return pd.Series(dtype="float64")
+    tab = _pivot(fluxos, "banco", meses, "total")
+    previsto = pd.Series(holt(tab.to_numpy(), minimo=None), index=tab.index)
+
+    return previsto * (futuros + (restante if tem_atual else 0))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+# Orçamento de pontos por série enviada ao navegador (independe do tamanho do histórico)
+PONTOS_POR_SERIE = 500
+
+
+def lttb(x, y, pontos=PONTOS_POR_SERIE):
+    """
+    Largest-Triangle-Three-Buckets: reduz a série (x, y) a `pontos` pontos preservando a forma.
+    Retorna os índices escolhidos (sempre inclui o primeiro e o último ponto).
+    """
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # limites dos baldes (sem o primeiro e o último ponto)
+    limites = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+
+    anterior = 0
+    for i in range(pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # média do próximo balde (ou o último ponto, no último balde)
+        prox_fim = limites[i + 2] if i + 2 < len(limites) else n
+        prox_x = x[fim:prox_fim].mean() if prox_fim > fim else x[-1]
+        prox_y = y[fim:prox_fim].mean() if prox_fim > fim else y[-1]
+
+        # ponto do balde que forma o maior triângulo com o anterior e a média do próximo
+        ax, ay = x[anterior], y[anterior]
+        areas = np.abs((ax - prox_x) * (y[inicio:fim] - ay) - (ax - x[inicio:fim]) * (prox_y - ay))
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+
+    return escolhidos
+
+
+def reduzir_series(df, x, y, serie, pontos=PONTOS_POR_SERIE):
+    """Aplica o LTTB a cada série de um DataFrame longo (uma linha por ponto)."""
+    partes = []
+    for _, grupo in df.groupby(serie, sort=False, observed=True):
+        grupo = grupo.sort_values(x)
+        eixo_x = grupo[x].to_numpy()
+        if np.issubdtype(eixo_x.dtype, np.datetime64):
+            eixo_x = eixo_x.astype("datetime64[ns]").astype(np.int64)
+        partes.append(grupo.iloc[lttb(eixo_x, grupo[y].to_numpy(), pontos)])
+    if not partes:
+        return df.iloc[0:0]
+    return pd.concat(partes, ignore_index=True)
@@ -0,0 +1,269 @@
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from db import (
+    get_connection, criar_job, atualizar_job, load_job, load_jobs,
+    _atualizar_job, _insert_transacoes, rebuild_resumo_mensal,
+    load_a_classificar, _classificar_transacoes, arquivar_excluidos, PASTA_ARQUIVO,
+)
+from importacao import ler_extrato, contar_linhas, extrato_para_transacoes
+from classificador import carregar_classificador
+from backup import fazer_backup, backup_pendente
+from ledgers import ledger_atual, usar_ledger, liberar_ledger, invalidar_cache, listar_ledgers, caminho_ledger
+
+# Executor único por processo do servidor (o módulo é importado uma vez e sobrevive aos reruns)
+MAX_WORKERS = 2
+
+STATUS_ATIVOS = ["pendente", "executando"]
+
+# Frequência com que o agendador confere se algum ledger precisa de backup (segundos)
+VERIFICAR_BACKUPS_A_CADA = 15 * 60
+
+_executor = None
+_lock = threading.Lock()
+_em_execucao = set()   # (ledger, id do job)
+_retomados = set()     # ledgers cujos jobs já foram retomados neste processo
+_agendador = None      # thread que enfileira os backups automáticos
+
+# tipo do job -> função(job, contexto)
+_HANDLERS = {}
+
+
+def tarefa(tipo):
+    """Registra uma função como handler de um tipo de job."""
+    def registrar(func):
+        _HANDLERS[tipo] = func
+        return func
+    return registrar
+
+
+class Contexto:
+    """Acesso do handler ao job em execução: parâmetros, checkpoint e progresso."""
+
+    def __init__(self, job):
+        self.id = job["id"]
+        self.parametros = job["parametros"]
+        self.checkpoint = job["checkpoint"]
+        self.temporarios = []
+
+    def remover_ao_concluir(self, arquivo):
+        # apagado só com o job concluído: se for interrompido, a retomada ainda precisa do arquivo
+        self.temporarios.append(arquivo)
+
+    def progresso(self, feito, total=None, checkpoint=None, cur=None):
+        campos = {"progresso": int(feito)}
+        if total is not None:
+            campos["total"] = int(total)
+        if checkpoint is not None:
+            campos["checkpoint"] = checkpoint
+            self.checkpoint = checkpoint
+        if cur is None:
+            atualizar_job(self.id, **campos)
+        else:
+            _atualizar_job(cur, self.id, **campos)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="mybudget-job")
+        return _executor
+
+
+def _submeter(ledger, job_id):
+    with _lock:
+        if (ledger, job_id) in _em_execucao:
+            return
+        _em_execucao.add((ledger, job_id))
+    _get_executor().submit(_executar, ledger, job_id)
+
+
+def _executar(ledger, job_id):
+    # o job roda no ledger em que foi criado (a thread do pool não conhece a sessão)
+    token = usar_ledger(ledger)
+    try:
+        job = load_job(job_id)
+        if job is None or job["status"] not in STATUS_ATIVOS:
+            return
+        handler = _HANDLERS.get(job["tipo"])
+        if handler is None:
+            atualizar_job(job_id, status="erro", mensagem=f"Tipo de job desconhecido: {job['tipo']}")
+            return
+
+        atualizar_job(job_id, status="executando")
+        ctx = Contexto(job)
+        mensagem = handler(job, ctx)
+        atualizar_job(job_id, status="concluido", mensagem=mensagem)
+        for arquivo in ctx.temporarios:
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+    except Exception as e:
+        traceback.print_exc()
+        atualizar_job(job_id, status="erro", mensagem=str(e))
+    finally:
+        liberar_ledger(token)
+        with _lock:
+            _em_execucao.discard((ledger, job_id))
+
+
+def enfileirar(tipo, **parametros):
+    """Cria o job na tabela `jobs` e o envia para execução em segundo plano."""
+    if tipo not in _HANDLERS:
+        raise ValueError(f"Tipo de job desconhecido: {tipo}")
+    job_id = criar_job(tipo, parametros)
+    _submeter(ledger_atual(), job_id)
+    return job_id
+
+
+def _agendar_backups():
+    # percorre os ledgers em disco e enfileira um backup para os que passaram do intervalo
+    while True:
+        for nome in listar_ledgers():
+            if not os.path.exists(caminho_ledger(nome)):
+                continue
+            token = usar_ledger(nome)
+            try:
+                if backup_pendente() and not load_jobs(status=STATUS_ATIVOS, tipos=["backup"], limite=1):
+                    enfileirar("backup")
+            except Exception:
+                traceback.print_exc()
+            finally:
+                liberar_ledger(token)
+        time.sleep(VERIFICAR_BACKUPS_A_CADA)
+
+
+def iniciar_agendador():
+    """Inicia (uma vez por processo) a thread que agenda os backups automáticos."""
+    global _agendador
+    with _lock:
+        if _agendador is not None:
+            return
+        _agendador = threading.Thread(target=_agendar_backups, name="mybudget-agendador", daemon=True)
+    _agendador.start()
+
+
+def retomar_jobs():
+    """
+    Reenvia jobs pendentes ou interrompidos (ex.: servidor reiniciado no meio da execução).
+    Executado uma vez por ledger em cada processo; os handlers continuam a partir do último checkpoint.
+    Também garante que o agendador de backups está rodando.
+    """
+    iniciar_agendador()
+    ledger = ledger_atual()
+    with _lock:
+        if ledger in _retomados:
+            return
+        _retomados.add(ledger)
+    for job in reversed(load_jobs(status=STATUS_ATIVOS)):
+        _submeter(ledger, job["id"])
+
+
+# -------- HANDLERS -------- #
+
+@tarefa("importar_extrato")
+def _importar_extrato(job, ctx):
+    arquivo, banco = ctx.parametros["arquivo"], ctx.parametros["banco"]
+    checkpoint = ctx.checkpoint or {}
+    inicio = checkpoint.get("linhas", 0)
+    total = contar_linhas(arquivo)
+    ctx.progresso(inicio, total)
+
+    importadas = checkpoint.get("importadas", 0)
+    ignoradas = checkpoint.get("ignoradas", 0)
+    contagem = {}
+    # classificador montado uma vez (regras + histórico anterior à importação)
+    classificador = carregar_classificador()
+    for lidas, lote in ler_extrato(arquivo):
+        if lidas <= inicio:
+            # lotes já gravados só são relidos para refazer a numeração de linhas idênticas
+            extrato_para_transacoes(lote, banco, contagem)
+            continue
+        txs = extrato_para_transacoes(lote, banco, contagem, classificador)
+
+        # lote e checkpoint na mesma transação; duplicatas são ignoradas pelo índice de impressões
+        conn = get_connection()
+        cur = conn.cursor()
+        inseridas = _insert_transacoes(cur, txs)
+        importadas += inseridas
+        ignoradas += len(txs) - inseridas
+        ctx.progresso(lidas, checkpoint={"linhas": lidas, "importadas": importadas, "ignoradas": ignoradas}, cur=cur)
+        conn.commit()
+        conn.close()
+        invalidar_cache()
+
+    ctx.remover_ao_concluir(arquivo)
+    mensagem = f"{importadas} lançamentos importados em {banco}."
+    if ignoradas:
+        mensagem += f" {ignoradas} duplicados ignorados."
+    return mensagem
+
+
+@tarefa("classificar_pendentes")
+def _classificar_pendentes(job, ctx):
+    # aplica regras/histórico aos lançamentos importados ainda "A classificar"
+    pendentes = load_a_classificar()
+    ctx.progresso(0, len(pendentes))
+    if pendentes.empty:
+        return "Nenhum lançamento a classificar."
+
+    sugestoes = carregar_classificador().classificar_series(pendentes["descricao"], pendentes["valor"])
+    sugerida = sugestoes["categoria"].notna()
+    classificacoes = [
+        (tipo, categoria, subcategoria if isinstance(subcategoria, str) else None, int(id_))
+        for tipo, categoria, subcategoria, id_ in zip(
+            sugestoes.loc[sugerida, "tipo"], sugestoes.loc[sugerida, "categoria"],
+            sugestoes.loc[sugerida, "subcategoria"], pendentes.loc[sugerida, "id"]
+        )
+    ]
+    conn = get_connection()
+    cur = conn.cursor()
+    _classificar_transacoes(cur, classificacoes)
+    ctx.progresso(len(pendentes), cur=cur)
+    conn.commit()
+    conn.close()
+    invalidar_cache()
+    return f"{len(classificacoes)} de {len(pendentes)} lançamentos classificados."
+
+
+@tarefa("reconstruir_resumo")
+def _reconstruir_resumo(job, ctx):
+    ctx.progresso(0, 1)
+    rebuild_resumo_mensal()
+    ctx.progresso(1)
+    return "Resumo mensal reconstruído."
+
+
+@tarefa("backup")
+def _backup(job, ctx):
+    # sem progresso durante a cópia: gravar na tabela `jobs` alteraria o banco e reiniciaria o backup
+    ctx.progresso(0, 1)
+    resultado = fazer_backup()
+    ctx.progresso(1)
+    mensagem = f"Cópia salva em {resultado['arquivo']} ({resultado['tamanho'] / 2**20:,.1f} MB em {resultado['segundos']}s)."
+    if resultado["removidos"]:
+        mensagem += f" {resultado['removidos']} cópias antigas removidas."
+    return mensagem
+
+
+@tarefa("arquivar")
+def _arquivar(job, ctx):
+    ctx.progresso(0, 1)
+    qtd = arquivar_excluidos()
+    ctx.progresso(1)
+    return f"{qtd} lançamentos excluídos movidos para {PASTA_ARQUIVO}/{ledger_atual()}.db."
+
+
+@tarefa("reindexar")
+def _reindexar(job, ctx):
+    ctx.progresso(0, 1)
+    conn = get_connection()
+    conn.execute("REINDEX")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    ctx.progresso(1)
+    return "Índices reconstruídos e estatísticas atualizadas."